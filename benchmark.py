@@ -0,0 +1,433 @@
+"""
+File: benchmark.py
+Purpose: Benchmarks for the hot paths: loading and saving the proof store,
+sorting the completed proofs, filling the completed Treeview, marking proofs
+complete and adding clients. Synthetic histories of 1k, 100k and 1M proofs are
+generated in a temp directory. The GUI timings run the real ProofWizard with its
+window hidden, which needs a display (use --xvfb to start a virtual one). The
+results are written as JSON so runs from different commits can be compared.
+
+Examples:
+    python benchmark.py -o before.json
+    python benchmark.py --sizes 1000,100000 --compare before.json
+
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from client_manager import ClientManager
+from proof_engine import ProofEngine
+from proof_index import ProofList
+from proof_record import Proof, format_date, timestamp
+from proof_store import (
+    COMPLETED_COLUMNS,
+    JOURNAL_FILE,
+    LEGACY_COMPLETED_FILE,
+    LEGACY_PENDING_FILE,
+    SNAPSHOT_FILE,
+    ProofStore,
+)
+
+SIZES = (1000, 100_000, 1_000_000)
+PENDING_SHARE = 0.1  # One proof in ten is still pending
+CLIENT_COUNT = 500
+USER_COUNT = 20
+OPERATIONS = 100  # Proofs or clients per add/complete benchmark
+REGRESSION_THRESHOLD = 1.25
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_proofs(count, seed=1):
+    """Returns (pending, completed) lists of synthetic proofs with ids."""
+    rng = random.Random(seed)
+    start = timestamp() - 365 * 24 * 60 * 60
+    pending = []
+    completed = []
+    for proof_id in range(1, count + 1):
+        created = start + rng.randrange(365 * 24 * 60 * 60)
+        proof = Proof(
+            client=f"Client {rng.randrange(CLIENT_COUNT)}",
+            proof_type=rng.choice(("Approval", "Generic")),
+            created_by=f"user{rng.randrange(USER_COUNT)}",
+            date_created=created,
+            id=proof_id,
+        )
+        if rng.random() < PENDING_SHARE:
+            pending.append(proof)
+        else:
+            completed.append(
+                proof.completed(
+                    f"user{rng.randrange(USER_COUNT)}",
+                    created + rng.randrange(60, 5 * 24 * 60 * 60),
+                )
+            )
+    return pending, completed
+
+
+def measure(function, repeat=3, setup=None):
+    """Returns the fastest of repeat runs in seconds. setup runs untimed before
+    each run and its result is passed to function."""
+    best = None
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        function(argument) if setup else function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def result(name, size, seconds, operations=1):
+    """One benchmark result as a dict for the JSON output."""
+    return {
+        "benchmark": name,
+        "size": size,
+        "seconds": round(seconds, 6),
+        "operations": operations,
+        "per_operation": round(seconds / operations, 9),
+    }
+
+
+def open_store(directory):
+    """A journal store on the files in directory, not loaded yet."""
+    return ProofStore(
+        snapshot_file=os.path.join(directory, SNAPSHOT_FILE),
+        journal_file=os.path.join(directory, JOURNAL_FILE),
+        pending_file=os.path.join(directory, LEGACY_PENDING_FILE),
+        completed_file=os.path.join(directory, LEGACY_COMPLETED_FILE),
+    )
+
+
+def write_store(directory, pending, completed):
+    """Writes a snapshot holding the proofs. Returns the time it took, which is
+    what every compaction costs at this size."""
+    store = open_store(directory).load()
+    for proof in pending:
+        store.pending.append(proof)
+    for proof in completed:
+        store.completed.append(proof)
+    store.next_id = len(pending) + len(completed) + 1
+    seconds = measure(store.compact, repeat=1)
+    store.close()
+    return seconds
+
+
+def store_benchmarks(directory, size):
+    """Times the proof store, sorting, completing and the legacy JSON import."""
+    repeat = 3 if size <= 100_000 else 1
+    pending, completed = make_proofs(size)
+    results = [
+        result("save_snapshot", size, write_store(directory, pending, completed))
+    ]
+
+    def load(part):
+        store = open_store(directory)
+        if part == "pending":
+            store.load_pending()
+        else:
+            store.load()
+        store.close()
+
+    results.append(
+        result("load_pending", size, measure(lambda: load("pending"), repeat))
+    )
+    results.append(result("load_store", size, measure(lambda: load("all"), repeat)))
+
+    store = open_store(directory).load()
+
+    def fresh_list():
+        # A new list has no cached sort index, like the first sort after startup
+        return ProofList(store.completed, COMPLETED_COLUMNS)
+
+    results.append(
+        result(
+            "sort_completed",
+            size,
+            measure(
+                lambda proofs: proofs.view([("client", False)]),
+                repeat,
+                setup=fresh_list,
+            ),
+        )
+    )
+    results.append(
+        result(
+            "sort_completed_multi",
+            size,
+            measure(
+                lambda proofs: proofs.view(
+                    [("client", False), ("date_completed", True)]
+                ),
+                repeat,
+                setup=fresh_list,
+            ),
+        )
+    )
+
+    engine = ProofEngine(store, "bench")
+
+    def add_proofs():
+        for _ in range(OPERATIONS):
+            engine.create_proof("Client 1", "Approval")
+        store.flush()
+
+    def complete_proofs():
+        engine.complete_proofs(ids)
+        store.flush()
+
+    results.append(
+        result("add_proof", size, measure(add_proofs, repeat=1), OPERATIONS)
+    )
+    ids = [proof.id for proof in store.pending.view()[:OPERATIONS]]
+    results.append(
+        result("complete_proofs", size, measure(complete_proofs, repeat=1), len(ids))
+    )
+    store.close()
+
+    # The old pending.json and completed.json files, imported on first run
+    legacy = os.path.join(directory, "legacy")
+    os.makedirs(legacy, exist_ok=True)
+    for filename, proofs in (
+        (LEGACY_PENDING_FILE, pending),
+        (LEGACY_COMPLETED_FILE, completed),
+    ):
+        with open(os.path.join(legacy, filename), "w", encoding="utf-8") as file:
+            json.dump([proof.to_dict() for proof in proofs], file, indent=4)
+
+    def import_legacy():
+        for name in (SNAPSHOT_FILE, JOURNAL_FILE):
+            if os.path.exists(os.path.join(legacy, name)):
+                os.remove(os.path.join(legacy, name))
+        open_store(legacy).load().close()
+
+    results.append(result("import_legacy_json", size, measure(import_legacy, 1)))
+    shutil.rmtree(legacy)
+    return results
+
+
+def client_benchmarks(directory, size):
+    """Times adding clients to a list of size // 10 clients."""
+    client_file = os.path.join(directory, "clients.json")
+    with open(client_file, "w", encoding="utf-8") as file:
+        json.dump([f"Client {number}" for number in range(size // 10)], file)
+    manager = ClientManager(client_file)
+
+    def add_clients():
+        for number in range(OPERATIONS):
+            manager.add_client(f"New client {number}")
+
+    def remove_clients():
+        for number in range(OPERATIONS):
+            manager.remove_client(f"New client {number}")
+
+    seconds = measure(add_clients, repeat=1)
+    remove_clients()
+    return [result("add_client", size, seconds, OPERATIONS)]
+
+
+def gui_benchmarks(directory, size):
+    """Times the GUI on the store in directory with the window hidden. Runs in
+    its own process because a Tk root and ttkbootstrap style can only be set up
+    once per process."""
+    import tkinter as tk
+
+    os.chdir(directory)
+    if not os.path.exists("images"):
+        os.symlink(os.path.join(REPO_DIR, "images"), "images")
+    try:
+        imported = time.perf_counter()
+        from proof_wizard import ProofWizard
+
+        start = time.perf_counter()
+        app = ProofWizard()
+    except (ImportError, tk.TclError) as error:
+        return {"skipped": str(error)}
+    app.withdraw()
+    app.update()
+    startup = time.perf_counter() - start
+    while not app.store.loaded:
+        app.update()
+        time.sleep(0.01)
+    history = time.perf_counter() - start
+    results = [
+        result("gui_import", size, start - imported),
+        result("gui_startup", size, startup),
+        result("gui_history_loaded", size, history),
+    ]
+
+    def shown(function):
+        """Runs a GUI method and waits for the redraw."""
+        function()
+        app.update_idletasks()
+
+    open_tab = measure(lambda: shown(app.setup_frm_completed), repeat=1)
+    results.append(result("gui_open_completed_tab", size, open_tab))
+    load = measure(lambda: shown(app.load_completed_proofs))
+    results.append(result("load_completed_proofs", size, load))
+    sort = measure(lambda: shown(lambda: app.sort_completed("client")))
+    results.append(result("gui_sort_completed", size, sort))
+
+    def select_pending():
+        app.pending_view.selected = {
+            proof.id: proof for proof in app.store.pending.view()[:OPERATIONS]
+        }
+
+    results.append(
+        result(
+            "mark_proof_complete",
+            size,
+            measure(
+                lambda unused: shown(app.mark_proof_complete),
+                setup=select_pending,
+            ),
+            OPERATIONS,
+        )
+    )
+    app.exit_app()
+    return results
+
+
+def run_gui_benchmarks(directory, size):
+    """Runs gui_benchmarks in a fresh process."""
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+        return pool.submit(gui_benchmarks, directory, size).result()
+
+
+def start_xvfb(display=":99"):
+    """Starts a virtual X display for the GUI benchmarks. Returns the process or
+    None if Xvfb is not installed."""
+    try:
+        process = subprocess.Popen(
+            ["Xvfb", display, "-screen", "0", "1280x1024x24"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+    except FileNotFoundError:
+        return None
+    time.sleep(1)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def git_commit():
+    """Returns the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=REPO_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, gui=True, directory=None):
+    """Runs every benchmark at each size. Returns the JSON report as a dict."""
+    report = {
+        "commit": git_commit(),
+        "date": format_date(timestamp()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+        "skipped": {},
+    }
+    for size in sizes:
+        size_dir = tempfile.mkdtemp(prefix=f"proof_bench_{size}_", dir=directory)
+        try:
+            print(f"{size} proofs...", file=sys.stderr)
+            report["results"] += store_benchmarks(size_dir, size)
+            report["results"] += client_benchmarks(size_dir, size)
+            if gui:
+                gui_results = run_gui_benchmarks(size_dir, size)
+                if isinstance(gui_results, dict):
+                    report["skipped"]["gui"] = gui_results["skipped"]
+                    gui = False
+                else:
+                    report["results"] += gui_results
+        finally:
+            shutil.rmtree(size_dir, ignore_errors=True)
+    return report
+
+
+def compare(old_report, new_report, threshold=REGRESSION_THRESHOLD):
+    """Prints new times against an earlier report. Returns the number of
+    benchmarks that got slower than the threshold ratio."""
+    old_times = {
+        (entry["benchmark"], entry["size"]): entry["seconds"]
+        for entry in old_report["results"]
+    }
+    slower = 0
+    print(f"{'benchmark':<26}{'size':>9}{'before':>11}{'after':>11}{'ratio':>8}")
+    for entry in new_report["results"]:
+        before = old_times.get((entry["benchmark"], entry["size"]))
+        if not before:
+            continue
+        ratio = entry["seconds"] / before
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            slower += 1
+        print(
+            f"{entry['benchmark']:<26}{entry['size']:>9}{before:>11.4f}"
+            f"{entry['seconds']:>11.4f}{ratio:>8.2f}{flag}"
+        )
+    return slower
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Proof Wizard benchmarks.")
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in SIZES),
+        help="comma separated history sizes",
+    )
+    parser.add_argument("-o", "--output", help="file for the JSON results")
+    parser.add_argument("--compare", help="earlier JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    parser.add_argument("--no-gui", action="store_true", help="skip the Tk timings")
+    parser.add_argument("--xvfb", action="store_true", help="start Xvfb for the GUI")
+    parser.add_argument("--dir", help="directory for the temp files")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    xvfb = None
+    if args.xvfb and not args.no_gui:
+        xvfb = start_xvfb()
+        if xvfb is None:
+            print("Xvfb is not installed, using the current display.", file=sys.stderr)
+    try:
+        report = run(sizes, gui=not args.no_gui, directory=args.dir)
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            slower = compare(json.load(file), report, args.threshold)
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,53 +7,327 @@ of clients.
 
 """
 
+import heapq
+import itertools
 import json
 import os
+import threading
+from bisect import bisect_left, insort
+
+import proof_db
+from file_lock import FileLock
+from proof_store import atomic_write_lines
+
+# Batches larger than this are merged into the sorted list in one pass
+MERGE_BATCH_SIZE = 64
+
+
+class ClientIndex:
+    """Search index over client names for type-ahead lookups.
+
+    Keeps a set for membership, a sorted list of case-folded names for prefix
+    searches and a map from each three letter sequence (trigram) to the names
+    containing it for substring searches.
+    """
+
+    def __init__(self, names=()):
+        self._names = set(names)
+        self._folded = sorted((name.casefold(), name) for name in self._names)
+        self._trigrams = {}
+        for folded, name in self._folded:
+            for gram in self._grams(folded):
+                self._trigrams.setdefault(gram, set()).add(name)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    @staticmethod
+    def _grams(text):
+        """Returns the set of trigrams in a case-folded string."""
+        return {text[index : index + 3] for index in range(len(text) - 2)}
+
+    def add(self, name):
+        """Adds a name. Returns False if it was already there."""
+        if name in self._names:
+            return False
+        self._names.add(name)
+        folded = name.casefold()
+        insort(self._folded, (folded, name))
+        for gram in self._grams(folded):
+            self._trigrams.setdefault(gram, set()).add(name)
+        return True
+
+    def remove(self, name):
+        """Removes a name. Returns False if it was not there."""
+        if name not in self._names:
+            return False
+        self._names.remove(name)
+        folded = name.casefold()
+        del self._folded[bisect_left(self._folded, (folded, name))]
+        for gram in self._grams(folded):
+            names = self._trigrams[gram]
+            names.discard(name)
+            if not names:
+                del self._trigrams[gram]
+        return True
+
+    def search(self, text, limit=50):
+        """Returns up to limit names matching text, ignoring case. Names that
+        start with the text come first, then names that contain it."""
+        text = text.strip().casefold()
+        matches = []
+        start = bisect_left(self._folded, (text, ""))
+        for folded, name in self._folded[start : start + limit]:
+            if not folded.startswith(text):
+                break
+            matches.append(name)
+        if len(matches) >= limit or not text:
+            return matches
+
+        if len(text) >= 3:
+            # Names holding every trigram of the text, smallest set first
+            grams = sorted(
+                (self._trigrams.get(gram, set()) for gram in self._grams(text)),
+                key=len,
+            )
+            candidates = set.intersection(*grams) if grams else set()
+        else:
+            candidates = self._names
+        found = set(matches)
+        extra = sorted(
+            (name.casefold(), name)
+            for name in candidates
+            if name not in found and text in name.casefold()
+        )
+        matches.extend(name for _, name in extra[: limit - len(matches)])
+        return matches
 
 
 class ClientManager:
-    """This class allows for adding or removing clients from a list of clients."""
+    """This class allows for adding or removing clients from a list of clients.
+
+    The client list is kept sorted with bisect, and a ClientIndex is kept next
+    to it for membership checks and type-ahead searches. add_clients() and
+    remove_clients() change many clients with a single save, merging large
+    batches into the list in one pass instead of one bisect per name.
 
-    def __init__(self, json_file="clients.json"):
+    The JSON file holds a plain sorted list of names, as it always has, and can
+    be shared by several processes. A save takes a file lock, reads the file again and
+    applies this process's adds and removes to it, so clients saved by someone
+    else in the meantime are merged in instead of overwritten. The new list is
+    written to a temp file and renamed over the old one. sync() picks up the
+    merged list afterwards.
+
+    When a database file is given the clients are kept in its clients table
+    instead of the JSON file, and each add or remove only writes its own rows. Set
+    writer to a function taking (key, job), such as IOWorker.submit, to save
+    on another thread.
+    """
+
+    def __init__(self, json_file="clients.json", db_file=None):
         self.json_file = json_file
-        self.clients = self.load_clients()
+        self.db = (
+            proof_db.connect(db_file, check_same_thread=False) if db_file else None
+        )
+        self.writer = None
+        self.conflicts = 0
+        self.file_lock = FileLock(json_file)
+        self._changes = []
+        self._changes_lock = threading.Lock()
+        self._latest = None
+        self._seen = set()  # Names in the file when this process last read it
+        self._batches = itertools.count()
+        self.clients = sorted(self.load_clients())
+        self.index = ClientIndex(self.clients)
 
     def load_clients(self):
-        """Loads the list of clients from the JSON file."""
-        if not os.path.exists(self.json_file):
-            return []
+        """Loads the list of clients from the JSON file or the database."""
+        if self.db is not None:
+            rows = self.db.execute("SELECT name FROM clients ORDER BY name")
+            return [name for (name,) in rows]
+        with self.file_lock:
+            clients = self._read_file()
+        self._seen = set(clients)
+        return clients
+
+    def _read_file(self):
+        """Reads the client list from the JSON file. A file that cannot be read
+        is moved aside so the next save does not overwrite it."""
         try:
             with open(self.json_file, "r", encoding="utf-8") as file:
-                clients = json.load(file)
-                return clients
+                data = json.load(file)
+        except FileNotFoundError:
+            return []
         except json.JSONDecodeError:
+            bad_file = self.json_file + ".corrupt"
+            os.replace(self.json_file, bad_file)
             print(
-                f"Error: Could not decode JSON from {self.json_file}. Starting with an empty list."
+                f"Error: Could not decode JSON from {self.json_file}. "
+                f"It was moved to {bad_file}, starting with an empty list."
             )
             return []
+        return data
+
+    def _schedule(self, key, job):
+        """Runs a save now, or hands it to the writer when one is set. Waiting
+        jobs with the same key are replaced by the newest one."""
+        if self.writer is None:
+            job()
+        else:
+            self.writer(key, job)
 
     def save_clients(self):
-        """Saves the list of clients to the JSON file."""
-        with open(self.json_file, "w", encoding="utf-8") as file:
-            json.dump(self.clients, file, indent=4)
+        """Saves the list of clients to the JSON file or the database."""
+        if self.db is not None:
+            clients = list(self.clients)
+            self._schedule(self.json_file, lambda: self._write_clients(clients))
+        else:
+            self._schedule(self.json_file, self._merge_clients)
+
+    def _write_clients(self, clients):
+        """Writes a copy of the client list to the database."""
+        with self.db:
+            self.db.execute("DELETE FROM clients")
+            self.db.executemany(
+                "INSERT INTO clients (name) VALUES (?)",
+                ((client,) for client in clients),
+            )
+
+    def _merge_clients(self):
+        """Applies the unsaved adds and removes to the newest file under the lock
+        and writes it back."""
+        with self.file_lock:
+            with self._changes_lock:
+                changes, self._changes = self._changes, []
+            try:
+                clients = self._read_file()
+                names = set(clients)
+                if names != self._seen:
+                    self.conflicts += 1  # Someone else saved since we last looked
+                for added, name in changes:
+                    if added:
+                        names.add(name)
+                    else:
+                        names.discard(name)
+                clients = sorted(names)
+                atomic_write_lines(self.json_file, [json.dumps(clients, indent=4)])
+            except Exception:
+                with self._changes_lock:
+                    self._changes[:0] = changes  # Keep them for the next save
+                raise
+            self._seen = names
+            self._latest = clients
+
+    def sync(self):
+        """Takes in clients saved by other processes that the last save found.
+        Returns True if the list changed."""
+        latest, self._latest = self._latest, None
+        if latest is None:
+            return False
+        names = set(latest)
+        with self._changes_lock:
+            for added, name in self._changes:  # Not saved yet, so not in latest
+                if added:
+                    names.add(name)
+                else:
+                    names.discard(name)
+        if names == set(self.clients):
+            return False
+        self.clients = sorted(names)
+        self.index = ClientIndex(self.clients)
+        return True
+
+    def reload_clients(self):
+        """Reads the file or database again and takes in clients saved by other
+        processes. Returns True if the list changed."""
+        if self.db is not None:
+            self._latest = self.load_clients()
+        else:
+            with self.file_lock:
+                self._latest = self._read_file()
+        return self.sync()
+
+    def _execute_many(self, sql, rows):
+        """Runs one statement for several rows in a single transaction."""
+        with self.db:
+            self.db.executemany(sql, rows)
+
+    def _save_changes(self, added, client_names):
+        """Saves a batch of adds or removes with one write."""
+        if self.db is not None:
+            if added:
+                sql = "INSERT OR IGNORE INTO clients (name) VALUES (?)"
+            else:
+                sql = "DELETE FROM clients WHERE name = ?"
+            rows = [(name,) for name in client_names]
+            # Each batch gets its own key so queued batches are never merged
+            self._schedule(
+                (self.json_file, next(self._batches)),
+                lambda: self._execute_many(sql, rows),
+            )
+        else:
+            # Remembered for the next merge with the file
+            with self._changes_lock:
+                self._changes.extend((added, name) for name in client_names)
+            self.save_clients()
+
+    def add_clients(self, client_names):
+        """Adds several clients with one save. Blank and known names are
+        skipped. Returns the names that were added."""
+        added = []
+        for name in client_names:
+            name = name.strip()
+            if name and self.index.add(name):
+                added.append(name)
+        if len(added) > MERGE_BATCH_SIZE:
+            self.clients = list(heapq.merge(self.clients, sorted(added)))
+        else:
+            for name in added:
+                insort(self.clients, name)  # Keep the list sorted
+        if added:
+            self._save_changes(True, added)
+        return added
+
+    def remove_clients(self, client_names):
+        """Removes several clients with one save. Returns the names that were
+        removed."""
+        removed = [name for name in client_names if self.index.remove(name)]
+        if len(removed) > MERGE_BATCH_SIZE:
+            gone = set(removed)
+            self.clients = [name for name in self.clients if name not in gone]
+        else:
+            for name in removed:
+                del self.clients[bisect_left(self.clients, name)]
+        if removed:
+            self._save_changes(False, removed)
+        return removed
 
     def add_client(self, client_name):
         """Adds a new client to the list if it doesn't already exist."""
-        if client_name not in self.clients:
-            self.clients.append(client_name)
-            self.clients.sort()  # Keep the list sorted
-            self.save_clients()
-            return f"Client '{client_name}' added."
+        if self.add_clients([client_name]):
+            return f"Client '{client_name.strip()}' added."
         return f"Client '{client_name}' already exists."
 
     def remove_client(self, client_name):
         """Removes a client from the list if it exists."""
-        if client_name in self.clients:
-            self.clients.remove(client_name)
-            self.save_clients()
+        if self.remove_clients([client_name]):
             return f"Client '{client_name}' removed."
         return f"Client '{client_name}' not found."
 
     def get_clients(self):
         """Returns the list of clients."""
         return self.clients
+
+    def search_clients(self, text, limit=50):
+        """Returns up to limit clients matching the typed text."""
+        return self.index.search(text, limit)
+
+
+def parse_client_names(text):
+    """Returns the client names in pasted text or a file, one per line, without
+    blank lines or repeats."""
+    names = (line.strip() for line in text.splitlines())
+    return list(dict.fromkeys(name for name in names if name))
@@ -0,0 +1,78 @@
+"""
+File: file_lock.py
+Purpose: Advisory lock on a file shared by several processes, for example two
+workstations saving the same client list. It uses fcntl on Linux and macOS and
+msvcrt on Windows.
+
+"""
+
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """An exclusive lock held on a separate "<path>.lock" file.
+
+    The lock can be taken again by the thread that holds it, so a method that
+    locks can call another one that locks. Other threads of the same process
+    wait on a threading lock, other processes wait on the file lock.
+
+    Use it as a context manager:
+
+        with FileLock("clients.json"):
+            ...
+    """
+
+    def __init__(self, path):
+        self.lock_file = path + ".lock"
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        """Waits for the lock."""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o666)
+                try:
+                    if fcntl is not None:
+                        fcntl.flock(fd, fcntl.LOCK_EX)
+                    else:
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                except OSError:
+                    os.close(fd)
+                    raise
+            except OSError:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+
+    def release(self):
+        """Releases the lock once for every acquire()."""
+        self._depth -= 1
+        if self._depth == 0:
+            fd, self._fd = self._fd, None
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                else:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.release()
@@ -0,0 +1,103 @@
+"""
+File: io_worker.py
+Purpose: A single background thread for disk writes so the tkinter event loop
+never waits on the disk. Saves of the same file that are queued before the
+thread gets to them are merged into one write.
+
+"""
+
+import queue
+import threading
+import time
+
+
+class IOWorker:
+    """Runs write jobs one at a time on a background thread.
+
+    Jobs are submitted with a key, normally the file they write. If a job with
+    the same key is still waiting, the new job replaces it instead of being
+    queued behind it. Results and errors are collected for poll(), which must
+    be called from the tkinter thread (for example with after()).
+
+    If timer is set, timer(key, seconds) is called on the worker thread after
+    every job, for example to record how long disk writes take.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._running = None
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._results = queue.Queue()
+        self.timer = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, job, on_done=None):
+        """Queues job() to run on the worker, merging it with a waiting job that
+        has the same key. on_done(result, error) is called later by poll()."""
+        with self._condition:
+            if self._stopping:
+                raise RuntimeError("The I/O worker has been stopped.")
+            callbacks = []
+            if key in self._jobs:
+                callbacks = self._jobs[key][1]
+            if on_done is not None:
+                callbacks.append(on_done)
+            self._jobs[key] = (job, callbacks)
+            self._condition.notify()
+
+    def poll(self):
+        """Runs the callbacks of finished jobs. Returns the errors that had no
+        callback to handle them."""
+        errors = []
+        while True:
+            try:
+                callbacks, result, error = self._results.get_nowait()
+            except queue.Empty:
+                return errors
+            for callback in callbacks:
+                callback(result, error)
+            if error is not None and not callbacks:
+                errors.append(error)
+
+    def flush(self, timeout=None):
+        """Waits until every queued job has run. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._jobs and self._running is None, timeout
+            )
+
+    def stop(self, timeout=None):
+        """Runs the remaining jobs and stops the thread."""
+        finished = self.flush(timeout)
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._thread.join(timeout)
+        return finished
+
+    def _run(self):
+        """Worker thread: takes the oldest job and runs it."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._jobs or self._stopping)
+                if not self._jobs:
+                    return
+                key = next(iter(self._jobs))
+                job, callbacks = self._jobs.pop(key)
+                self._running = key
+
+            result = error = None
+            start = time.perf_counter()
+            try:
+                result = job()
+            except Exception as exc:
+                error = exc
+            if self.timer is not None:
+                self.timer(key, time.perf_counter() - start)
+            self._results.put((callbacks, result, error))
+
+            with self._condition:
+                self._running = None
+                self._condition.notify_all()
@@ -0,0 +1,185 @@
+"""
+File: perf_monitor.py
+Purpose: Lightweight timing for the GUI. Each timed operation goes into a latency
+histogram with logarithmic buckets, so recording is cheap and memory stays small
+however long the app runs. It also times disk writes on the I/O worker and
+measures how late an after() heartbeat fires, which shows when the event loop
+was blocked. The numbers can be shown in the app or written to a JSON file.
+StartupProfile times the steps of opening the program one after another.
+
+Example:
+    monitor = PerfMonitor()
+    monitor.instrument(app, ("make_proof", "sort_pending"))
+    monitor.start_heartbeat(app)
+    ...
+    monitor.dump("perf_report.json")
+
+"""
+
+import functools
+import json
+import math
+import os
+import platform
+import threading
+import time
+
+from proof_record import format_date, timestamp
+
+PERF_FILE = "perf_report.json"
+HEARTBEAT_MS = 50
+PERCENTILES = (50, 95, 99)
+BUCKET_GROWTH = 1.1  # Each bucket is 10% wider than the last
+SMALLEST = 1e-6  # Times below a microsecond share the first bucket
+STALL = "event loop stall"
+
+
+class LatencyHistogram:
+    """Counts of times in logarithmic buckets, with the exact count, total and
+    maximum. Percentiles are accurate to within half the 10% bucket width."""
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        bucket = 0
+        if seconds > SMALLEST:
+            bucket = int(math.log(seconds / SMALLEST, BUCKET_GROWTH)) + 1
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, percent):
+        """Returns the middle of the bucket holding the percentile, in seconds,
+        but never more than the largest time seen."""
+        if not self.count:
+            return 0.0
+        rank = percent / 100 * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(SMALLEST * BUCKET_GROWTH ** (bucket - 0.5), self.max)
+        return self.max
+
+    def summary(self):
+        """Returns count, mean, percentiles and max in milliseconds."""
+        stats = {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0,
+        }
+        for percent in PERCENTILES:
+            stats[f"p{percent}_ms"] = round(self.percentile(percent) * 1000, 3)
+        stats["max_ms"] = round(self.max * 1000, 3)
+        return stats
+
+
+class StartupProfile:
+    """Times the phases of starting the program. Each mark() ends a phase that
+    started at the previous mark, or at started for the first one."""
+
+    def __init__(self, started=None):
+        self.phases = []
+        self._last = time.perf_counter() if started is None else started
+
+    def mark(self, name):
+        """Ends the current phase and names it."""
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    def report(self):
+        """Returns the phases and the total as a table in milliseconds."""
+        width = max([len(name) for name, _ in self.phases] + [5])
+        lines = [
+            f"{name:<{width}}  {seconds * 1000:8.1f} ms"
+            for name, seconds in self.phases
+        ]
+        total = sum(seconds for _, seconds in self.phases)
+        lines.append(f"{'total':<{width}}  {total * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+
+class PerfMonitor:
+    """Latency histograms by operation name. record() may be called from any
+    thread."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.started = timestamp()
+        self._lock = threading.Lock()
+        self._heartbeat_due = None
+
+    def record(self, name, seconds):
+        """Adds one timing in seconds."""
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.add(seconds)
+
+    def timed(self, name, function):
+        """Returns function wrapped so every call is recorded under name."""
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.record(name, time.perf_counter() - start)
+
+        return wrapper
+
+    def instrument(self, obj, method_names):
+        """Replaces methods on one object with timed versions. Call it before the
+        methods are handed to widgets or after() as callbacks."""
+        for name in method_names:
+            setattr(obj, name, self.timed(name, getattr(obj, name)))
+
+    def record_write(self, key, seconds):
+        """Timer for IOWorker: records a disk write under the file it wrote."""
+        self.record(f"disk write {os.path.basename(str(key))}", seconds)
+
+    def start_heartbeat(self, widget, interval_ms=HEARTBEAT_MS):
+        """Schedules an after() callback every interval and records how late it
+        runs. While a callback blocks the event loop the heartbeat cannot fire,
+        so the lateness is the time the window was frozen."""
+        self._heartbeat_due = time.perf_counter() + interval_ms / 1000
+        widget.after(interval_ms, self._heartbeat, widget, interval_ms)
+
+    def _heartbeat(self, widget, interval_ms):
+        now = time.perf_counter()
+        self.record(STALL, max(0.0, now - self._heartbeat_due))
+        self._heartbeat_due = now + interval_ms / 1000
+        widget.after(interval_ms, self._heartbeat, widget, interval_ms)
+
+    def summary(self):
+        """Returns {name: stats} for every operation, sorted by name."""
+        with self._lock:
+            return {
+                name: self.histograms[name].summary()
+                for name in sorted(self.histograms)
+            }
+
+    def reset(self):
+        """Forgets every timing."""
+        with self._lock:
+            self.histograms.clear()
+            self.started = timestamp()
+
+    def dump(self, filename=PERF_FILE):
+        """Writes the summary to a JSON file for a field report."""
+        report = {
+            "started": format_date(self.started),
+            "written": format_date(timestamp()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "operations": self.summary(),
+        }
+        with open(filename, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=4)
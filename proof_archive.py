@@ -0,0 +1,152 @@
+"""
+File: proof_archive.py
+Purpose: Archive for old completed proofs. Archived proofs are moved out of the
+completed list into one gzip compressed JSON Lines file per month. A small
+manifest records the date range of each month so a search only opens the files
+that can hold matching proofs.
+
+"""
+
+import gzip
+import json
+import os
+import time
+
+from file_lock import FileLock
+from proof_record import Proof, format_date, parse_date
+from proof_store import atomic_write_lines, fsync_directory
+
+ARCHIVE_DIR = "archive"
+ARCHIVE_AGE_DAYS = 90
+MANIFEST_FILE = "manifest.json"
+
+
+def archive_cutoff(max_age_days=ARCHIVE_AGE_DAYS, now=None):
+    """Returns the completion time (epoch seconds) before which proofs get
+    archived."""
+    now = time.time() if now is None else now
+    return int(now) - max_age_days * 24 * 60 * 60
+
+
+class ProofArchive:
+    """Month partitions of archived proofs with a manifest of their date ranges.
+
+    Each partition is named after the year and month the proofs were completed,
+    for example 2024-09.jsonl.gz. New proofs are appended as another gzip member,
+    so archiving never rewrites the proofs that are already there.
+
+    Several processes can archive into one directory. add() holds a file lock
+    and reads the manifest again before changing it, and query() and count()
+    read it again too, so a partition added by another process is never lost.
+    add() also skips proofs that are already in their partition, so archiving
+    the same proofs twice (from two processes, or again after a crash before
+    the store removed them) does not write them twice.
+    """
+
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+        self.manifest_file = os.path.join(directory, MANIFEST_FILE)
+        self.file_lock = FileLock(self.manifest_file)
+        self.partitions = self.load_manifest()
+
+    def load_manifest(self):
+        """Loads the partition manifest, or an empty one."""
+        try:
+            with open(self.manifest_file, "r", encoding="utf-8") as file:
+                return json.load(file)["partitions"]
+        except FileNotFoundError:
+            return {}
+
+    def save_manifest(self):
+        """Writes the manifest with a crash-safe rename."""
+        atomic_write_lines(
+            self.manifest_file, [json.dumps({"partitions": self.partitions}, indent=4)]
+        )
+
+    def add(self, proofs):
+        """Appends completed proofs to their month partitions, leaving out the
+        ones already archived. Returns how many proofs were written."""
+        months = {}
+        for proof in proofs:
+            month = format_date(proof.date_completed)[:7]
+            months.setdefault(month, {})[proof.id] = proof
+        if not months:
+            return 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        with self.file_lock:
+            # Another process may have archived since this one last looked
+            self.partitions = self.load_manifest()
+            for month, month_proofs in list(months.items()):
+                for proof_id in self._archived_ids(month):
+                    month_proofs.pop(proof_id, None)
+                if month_proofs:
+                    months[month] = list(month_proofs.values())
+                else:
+                    del months[month]
+            if months:
+                self._write_months(months)
+        return sum(len(month_proofs) for month_proofs in months.values())
+
+    def _archived_ids(self, month):
+        """Returns the ids of the proofs in a month partition. Needs the file
+        lock."""
+        partition = self.partitions.get(month)
+        if partition is None:
+            return set()
+        path = os.path.join(self.directory, partition["file"])
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            return {json.loads(line)["id"] for line in file}
+
+    def _write_months(self, months):
+        """Appends {month: proofs} to the partitions and saves the manifest.
+        Needs the file lock."""
+        for month, month_proofs in months.items():
+            file_name = f"{month}.jsonl.gz"
+            with open(os.path.join(self.directory, file_name), "ab") as raw:
+                with gzip.GzipFile(fileobj=raw, mode="ab") as file:
+                    for proof in month_proofs:
+                        line = json.dumps(proof.to_dict(), separators=(",", ":"))
+                        file.write(line.encode())
+                        file.write(b"\n")
+                raw.flush()
+                os.fsync(raw.fileno())
+
+            dates = [proof.date_completed for proof in month_proofs]
+            partition = self.partitions.setdefault(
+                month, {"file": file_name, "count": 0, "first": min(dates), "last": 0}
+            )
+            partition["count"] += len(month_proofs)
+            partition["first"] = min(partition["first"], min(dates))
+            partition["last"] = max(partition["last"], max(dates))
+        fsync_directory(self.directory)
+        self.save_manifest()
+
+    def query(self, start=None, end=None):
+        """Yields archived proofs completed from start up to (not including) end,
+        given as epoch seconds or date strings. Only the partitions whose date
+        range overlaps are opened."""
+        start = parse_date(start)
+        end = parse_date(end)
+        self.partitions = self.load_manifest()
+        for month in sorted(self.partitions):
+            partition = self.partitions[month]
+            if start is not None and partition["last"] < start:
+                continue
+            if end is not None and partition["first"] >= end:
+                continue
+            path = os.path.join(self.directory, partition["file"])
+            with gzip.open(path, "rt", encoding="utf-8") as file:
+                for line in file:
+                    proof = Proof.from_dict(json.loads(line))
+                    date = proof.date_completed
+                    if start is not None and date < start:
+                        continue
+                    if end is not None and date >= end:
+                        continue
+                    yield proof
+
+    def count(self):
+        """Returns the number of archived proofs."""
+        self.partitions = self.load_manifest()
+        return sum(partition["count"] for partition in self.partitions.values())
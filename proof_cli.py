@@ -0,0 +1,312 @@
+"""
+File: proof_cli.py
+Purpose: Command line tool for working with proofs without the GUI, for example
+from the production system. It can create proofs in bulk from a CSV or JSON Lines
+file, complete, cancel or reassign pending proofs by filter, archive old proofs
+and read them back, export and import proofs as JSON Lines and convert the old
+JSON files.
+
+Examples:
+    python proof_cli.py create proofs.csv
+    python proof_cli.py complete --client "Client A" --before 2024-10-01
+    python proof_cli.py reassign --created-by user1 --to user2
+    python proof_cli.py export --status completed --format csv -o completed.csv
+    python proof_cli.py import history.jsonl.gz
+    python proof_cli.py archived --start 2024-01 --end 2024-04 -o q1.jsonl
+    python proof_cli.py convert completed.json completed.jsonl
+    python proof_cli.py report client-turnaround
+
+"""
+
+import argparse
+import csv
+import sys
+
+from proof_archive import ARCHIVE_AGE_DAYS, ProofArchive, archive_cutoff
+from proof_engine import ProofEngine, open_store
+from proof_jsonl import (
+    append_jsonl,
+    convert_to_jsonl,
+    iter_records,
+    open_text,
+    read_proofs,
+    write_jsonl,
+)
+from proof_record import format_date
+
+EXPORT_FIELDS = (
+    "id",
+    "client",
+    "proof_type",
+    "created_by",
+    "date_created",
+    "date_completed",
+    "completed_by",
+)
+
+# Report command names for the reports in proof_report.REPORTS
+REPORT_NAMES = {
+    "clients": "Proofs per client",
+    "client-turnaround": "Approval turnaround by client",
+    "user-turnaround": "Approval turnaround by user",
+    "throughput": "Completed per user per day",
+}
+
+
+def read_rows(filename):
+    """Yields proof rows from a CSV file with a header line, or a JSON Lines or
+    JSON array file."""
+    if filename.endswith((".jsonl", ".json", ".gz")):
+        yield from iter_records(filename)
+        return
+    with open(filename, "r", encoding="utf-8", newline="") as file:
+        yield from csv.DictReader(file)
+
+
+def write_proofs(proofs, output, file_format):
+    """Writes proofs to an open file as JSON Lines or CSV. Returns the count.
+    JSON Lines keeps dates as epoch seconds, CSV writes them as local time."""
+    count = 0
+    if file_format == "csv":
+        writer = csv.DictWriter(
+            output, fieldnames=EXPORT_FIELDS, restval="", extrasaction="ignore"
+        )
+        writer.writeheader()
+        for proof in proofs:
+            row = proof.to_dict()
+            row["date_created"] = format_date(proof.date_created)
+            if proof.is_completed:
+                row["date_completed"] = format_date(proof.date_completed)
+            writer.writerow(row)
+            count += 1
+    else:
+        count = write_jsonl(output, proofs)
+    return count
+
+
+def cmd_create(engine, args):
+    """Creates proofs from a file."""
+    proofs = engine.create_proofs(read_rows(args.file))
+    print(f"Created {len(proofs)} proofs.")
+
+
+def chosen_ids(engine, args):
+    """Returns the pending proof ids given with --ids or matching the filters."""
+    if args.ids:
+        return [int(proof_id) for proof_id in args.ids.split(",")]
+    proofs = engine.find_pending(
+        client=args.client,
+        created_by=args.created_by,
+        before=args.before,
+        after=args.after,
+    )
+    return [proof.id for proof in proofs]
+
+
+def cmd_complete(engine, args):
+    """Completes pending proofs chosen by id or by filter."""
+    proof_ids = chosen_ids(engine, args)
+    if args.dry_run:
+        print(f"Would complete {len(proof_ids)} proofs.")
+        return
+    completed = engine.complete_proofs(proof_ids)
+    print(f"Completed {len(completed)} proofs.")
+
+
+def cmd_cancel(engine, args):
+    """Cancels pending proofs chosen by id or by filter."""
+    proof_ids = chosen_ids(engine, args)
+    if args.dry_run:
+        print(f"Would cancel {len(proof_ids)} proofs.")
+        return
+    cancelled = engine.cancel_proofs(proof_ids)
+    print(f"Cancelled {len(cancelled)} proofs.")
+
+
+def cmd_reassign(engine, args):
+    """Gives pending proofs chosen by id or by filter to another user."""
+    proof_ids = chosen_ids(engine, args)
+    if args.dry_run:
+        print(f"Would reassign {len(proof_ids)} proofs to {args.to}.")
+        return
+    reassigned = engine.reassign_proofs(proof_ids, args.to)
+    print(f"Reassigned {len(reassigned)} proofs to {args.to}.")
+
+
+def cmd_archive(engine, args):
+    """Moves completed proofs older than a number of days to the archive."""
+    proofs = engine.store.archive_candidates(archive_cutoff(args.days))
+    ProofArchive(args.archive_dir).add(proofs)
+    archived = engine.store.archive_proofs([proof.id for proof in proofs])
+    print(f"Archived {len(archived)} proofs.")
+
+
+def cmd_archived(engine, args):
+    """Counts archived proofs, or writes the ones completed in a date range."""
+    archive = ProofArchive(args.archive_dir)
+    if args.count and args.start is None and args.end is None:
+        print(archive.count())
+        return
+    proofs = archive.query(args.start, args.end)
+    if args.count:
+        print(sum(1 for _ in proofs))
+    elif args.output:
+        with open_text(args.output, "w") as output:
+            count = write_proofs(proofs, output, args.format)
+        print(f"Exported {count} archived proofs to {args.output}.")
+    else:
+        write_proofs(proofs, sys.stdout, args.format)
+
+
+def cmd_export(engine, args):
+    """Writes proofs to a file or standard output."""
+    sort_keys = [(args.sort, args.descending)] if args.sort else []
+    proofs = engine.export(args.status, sort_keys)
+    if args.append and args.format == "csv":
+        raise ValueError("--append only works with the jsonl format.")
+    if args.output and args.append:
+        count = append_jsonl(args.output, proofs)
+        print(f"Appended {count} proofs to {args.output}.")
+    elif args.output:
+        with open_text(args.output, "w") as output:
+            count = write_proofs(proofs, output, args.format)
+        print(f"Exported {count} proofs to {args.output}.")
+    else:
+        write_proofs(proofs, sys.stdout, args.format)
+
+
+def cmd_import(engine, args):
+    """Adds proofs from an export, keeping their dates and completion."""
+    count = engine.import_proofs(read_proofs(args.file))
+    print(f"Imported {count} proofs.")
+
+
+def cmd_convert(engine, args):
+    """Converts an indented JSON array proof file to JSON Lines."""
+    count = convert_to_jsonl(args.source, args.target)
+    print(f"Converted {count} proofs to {args.target}.")
+
+
+def cmd_report(engine, args):
+    """Prints a throughput report as tab separated columns."""
+    import proof_report  # Needs NumPy, which the other commands do not
+
+    table = proof_report.ProofTable.from_store(engine.store)
+    columns, rows = proof_report.REPORTS[REPORT_NAMES[args.report]](table)
+    print("\t".join(columns))
+    for row in rows:
+        print("\t".join(str(value) for value in row))
+
+
+def build_parser():
+    """Builds the argument parser for all commands."""
+    parser = argparse.ArgumentParser(
+        prog="proof-wizard", description="Create, complete and export proofs."
+    )
+    parser.add_argument("--db", help="use a SQLite database instead of the journal")
+    parser.add_argument("--user", help="user name to record (default: OS user)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="create proofs from CSV or JSONL")
+    create.add_argument("file", help="file with client and proof_type columns")
+    create.set_defaults(func=cmd_create)
+
+    # complete, cancel and reassign choose pending proofs the same way
+    for name, help_text, func in (
+        ("complete", "complete pending proofs", cmd_complete),
+        ("cancel", "cancel pending proofs", cmd_cancel),
+        ("reassign", "give pending proofs to another user", cmd_reassign),
+    ):
+        command = commands.add_parser(name, help=help_text)
+        if name == "reassign":
+            command.add_argument("--to", required=True, help="user to give them to")
+        command.add_argument("--ids", help="comma separated proof ids")
+        command.add_argument("--client", help="only proofs for this client")
+        command.add_argument("--created-by", help="only proofs created by this user")
+        command.add_argument("--before", help="only proofs created before this date")
+        command.add_argument(
+            "--after", help="only proofs created on or after this date"
+        )
+        command.add_argument(
+            "--dry-run", action="store_true", help="only show how many would change"
+        )
+        command.set_defaults(func=func)
+
+    archive = commands.add_parser("archive", help="archive old completed proofs")
+    archive.add_argument("--days", type=int, default=ARCHIVE_AGE_DAYS)
+    archive.add_argument("--archive-dir", default="archive")
+    archive.set_defaults(func=cmd_archive)
+
+    archived = commands.add_parser("archived", help="read back archived proofs")
+    archived.add_argument(
+        "--start", help="only proofs completed on or after this date"
+    )
+    archived.add_argument("--end", help="only proofs completed before this date")
+    archived.add_argument(
+        "--count", action="store_true", help="only print how many there are"
+    )
+    archived.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    archived.add_argument("-o", "--output", help="file to write (default: stdout)")
+    archived.add_argument("--archive-dir", default="archive")
+    archived.set_defaults(func=cmd_archived, needs_store=False)
+
+    export = commands.add_parser("export", help="export proofs")
+    export.add_argument(
+        "--status", choices=["pending", "completed", "all"], default="completed"
+    )
+    export.add_argument("--format", choices=["jsonl", "csv"], default="jsonl")
+    export.add_argument("--sort", help="column to sort by")
+    export.add_argument("--descending", action="store_true")
+    export.add_argument("-o", "--output", help="file to write (default: stdout)")
+    export.add_argument(
+        "--append", action="store_true", help="add to the end of a jsonl file"
+    )
+    export.set_defaults(func=cmd_export)
+
+    import_parser = commands.add_parser(
+        "import", help="add proofs from a JSON Lines or JSON export"
+    )
+    import_parser.add_argument("file", help=".jsonl, .jsonl.gz or .json file")
+    import_parser.set_defaults(func=cmd_import)
+
+    convert = commands.add_parser(
+        "convert", help="convert a JSON array proof file to JSON Lines"
+    )
+    convert.add_argument("source", help="for example completed.json")
+    convert.add_argument("target", help="for example completed.jsonl")
+    convert.set_defaults(func=cmd_convert, needs_store=False)
+
+    report = commands.add_parser("report", help="print a throughput report")
+    report.add_argument(
+        "report",
+        nargs="?",
+        choices=list(REPORT_NAMES),
+        default="clients",
+    )
+    report.set_defaults(func=cmd_report)
+    return parser
+
+
+def main(argv=None):
+    """Command line entry point."""
+    args = build_parser().parse_args(argv)
+    if not getattr(args, "needs_store", True):
+        try:
+            args.func(None, args)
+        except (OSError, ValueError) as error:
+            print(f"Error: {error}", file=sys.stderr)
+            return 1
+        return 0
+    store = open_store(args.db).load()
+    try:
+        args.func(ProofEngine(store, args.user), args)
+    except (OSError, ValueError) as error:
+        print(f"Error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
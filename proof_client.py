@@ -0,0 +1,341 @@
+"""
+File: proof_client.py
+Purpose: Client side of the proof server. RemoteProofStore and RemoteClientManager
+have the same methods as the local store and client manager, so the GUI and the
+proof engine can run as thin clients against a shared server. It also has a small
+load test that reports requests per second.
+
+Example:
+    python proof_client.py bench --requests 5000 --concurrency 16
+
+"""
+
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+from proof_record import Proof
+
+SERVER_URL = "http://127.0.0.1:8765"
+
+
+class ProofClient:
+    """One keep-alive HTTP connection to the proof server. Not thread safe, use
+    one client per thread."""
+
+    def __init__(self, url=SERVER_URL, timeout=30):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self.connection = None
+
+    def request(self, method, path, data=None, query=None):
+        """Sends one request and returns the decoded JSON answer. Errors from the
+        server are raised as ValueError with the server's message."""
+        if query:
+            path += "?" + urlencode(query)
+        body = None
+        if data is not None:
+            body = json.dumps(data, default=Proof.to_dict).encode()
+        headers = {"Content-Type": "application/json"} if body else {}
+        for attempt in range(2):
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout
+                )
+            try:
+                self.connection.request(method, path, body, headers)
+                response = self.connection.getresponse()
+                payload = json.loads(response.read() or b"null")
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the kept-alive connection, open a new one once
+                self.close()
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise ValueError(payload.get("error", f"HTTP {response.status}"))
+        return payload
+
+    def close(self):
+        """Closes the connection."""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class RemoteProofView:
+    """A sorted view of proofs on the server, fetched one page at a time."""
+
+    def __init__(self, client, status, sort_keys=(), page_size=200):
+        self.client = client
+        self.status = status
+        self.page_size = page_size
+        self.sort = ",".join(
+            ("-" if descending else "") + column for column, descending in sort_keys
+        )
+        self.pages = {}
+        self.total = self._fetch(0)["total"]
+
+    def _fetch(self, page_number):
+        """Fetches one page and remembers it."""
+        answer = self.client.request(
+            "GET",
+            "/proofs",
+            query={
+                "status": self.status,
+                "offset": page_number * self.page_size,
+                "limit": self.page_size,
+                "sort": self.sort,
+            },
+        )
+        self.pages[page_number] = [
+            Proof.from_dict(proof) for proof in answer["proofs"]
+        ]
+        return answer
+
+    def _page(self, page_number):
+        if page_number not in self.pages:
+            self._fetch(page_number)
+        return self.pages[page_number]
+
+    def __len__(self):
+        return self.total
+
+    def __iter__(self):
+        for start in range(0, self.total, self.page_size):
+            yield from self._page(start // self.page_size)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.total)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            records = []
+            for page_number in range(
+                start // self.page_size, (stop - 1) // self.page_size + 1
+            ):
+                records.extend(self._page(page_number))
+            offset = (start // self.page_size) * self.page_size
+            return records[start - offset : stop - offset]
+        if index < 0:
+            index += self.total
+        if not 0 <= index < self.total:
+            raise IndexError("proof view index out of range")
+        return self._page(index // self.page_size)[index % self.page_size]
+
+
+class RemoteProofTable:
+    """The pending or completed proofs on the server."""
+
+    def __init__(self, client, status):
+        self.client = client
+        self.status = status
+
+    def __len__(self):
+        query = {"status": self.status, "limit": 0}
+        return self.client.request("GET", "/proofs", query=query)["total"]
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def get(self, proof_id):
+        """Returns the proof with this id, or None."""
+        try:
+            proof = self.client.request(
+                "GET", f"/proofs/{proof_id}", query={"status": self.status}
+            )
+        except ValueError:
+            return None
+        return Proof.from_dict(proof)
+
+    def view(self, sort_keys=()):
+        """Returns the proofs sorted by the (column, descending) keys."""
+        return RemoteProofView(self.client, self.status, sort_keys)
+
+
+class RemoteProofCounters:
+    """The proof counts kept by the server."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def summary(self, client=None, user=None, day=None):
+        """Returns {kind: count} for every kind whose key parts are given."""
+        query = {"client": client, "user": user, "day": day}
+        query = {name: value for name, value in query.items() if value is not None}
+        return self.client.request("GET", "/counters", query=query)
+
+
+class RemoteProofStore:
+    """Proof store methods that call the proof server. The server owns the data
+    and the disk, so loading and flushing are no-ops here."""
+
+    loaded = True
+    batch_interval = 2.0
+
+    def __init__(self, url=SERVER_URL):
+        self.client = ProofClient(url)
+        self.pending = RemoteProofTable(self.client, "pending")
+        self.completed = RemoteProofTable(self.client, "completed")
+        self.counters = RemoteProofCounters(self.client)
+        self.writer = None
+
+    def load(self):
+        return self
+
+    def load_pending(self):
+        return self
+
+    def read_completed_pages(self, page_size=5000):
+        return iter(())
+
+    def add_completed_page(self, page):
+        pass
+
+    def finish_loading(self):
+        pass
+
+    def add_proof(self, proof):
+        """Creates a proof on the server and returns it with its id."""
+        return self.add_proofs([proof])[0]
+
+    def add_proofs(self, proofs):
+        """Creates several proofs on the server with one request."""
+        added = self.client.request("POST", "/proofs", {"proofs": list(proofs)})
+        return [Proof.from_dict(proof) for proof in added]
+
+    def complete_proofs(self, proof_ids, completed_by, date_completed):
+        """Completes pending proofs on the server. Returns the completed ids."""
+        data = {
+            "ids": list(proof_ids),
+            "user": completed_by,
+            "date_completed": date_completed,
+        }
+        return self.client.request("POST", "/proofs/complete", data)["ids"]
+
+    def cancel_proofs(self, proof_ids):
+        """Cancels pending proofs on the server."""
+        data = {"ids": list(proof_ids)}
+        return self.client.request("POST", "/proofs/cancel", data)["ids"]
+
+    def reassign_proofs(self, proof_ids, created_by):
+        """Gives pending proofs on the server to another user."""
+        data = {"ids": list(proof_ids), "user": created_by}
+        return self.client.request("POST", "/proofs/reassign", data)["ids"]
+
+    def archive_candidates(self, cutoff):
+        raise RuntimeError("Archiving runs on the server, use proof_cli.py there.")
+
+    def archive_proofs(self, proof_ids):
+        raise RuntimeError("Archiving runs on the server, use proof_cli.py there.")
+
+    def refresh(self):
+        return False  # Views fetch from the server, see ProofWizard.refresh_remote
+
+    def request_flush(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.client.close()
+
+
+class RemoteClientManager:
+    """Client list methods that call the proof server."""
+
+    def __init__(self, url=SERVER_URL):
+        self.client = ProofClient(url)
+        self.writer = None
+
+    def add_client(self, client_name):
+        return self.client.request("POST", "/clients", {"name": client_name})["message"]
+
+    def remove_client(self, client_name):
+        data = {"name": client_name}
+        return self.client.request("POST", "/clients/remove", data)["message"]
+
+    def add_clients(self, client_names):
+        data = {"names": list(client_names)}
+        return self.client.request("POST", "/clients", data)["added"]
+
+    def remove_clients(self, client_names):
+        data = {"names": list(client_names)}
+        return self.client.request("POST", "/clients/remove", data)["removed"]
+
+    def get_clients(self):
+        return self.client.request("GET", "/clients")
+
+    def sync(self):
+        return False  # The list is fetched from the server every time
+
+    def reload_clients(self):
+        return True
+
+    def search_clients(self, text, limit=50):
+        query = {"q": text, "limit": limit}
+        return self.client.request("GET", "/clients", query=query)
+
+
+def bench(url, requests, concurrency):
+    """Creates proofs from several threads at once and reports the request rate.
+    Checks afterwards that every proof arrived."""
+    client = ProofClient(url)
+    before = len(RemoteProofTable(client, "pending"))
+    errors = []
+
+    def worker(count, number):
+        worker_client = ProofClient(url)
+        row = {"client": f"Bench {number}", "proof_type": "Approval", "user": "bench"}
+        try:
+            for _ in range(count):
+                worker_client.request("POST", "/proofs", row)
+        except Exception as error:
+            errors.append(error)
+        finally:
+            worker_client.close()
+
+    counts = [requests // concurrency] * concurrency
+    for number in range(requests % concurrency):
+        counts[number] += 1
+    threads = [
+        threading.Thread(target=worker, args=(count, number))
+        for number, count in enumerate(counts)
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    created = len(RemoteProofTable(client, "pending")) - before
+    client.close()
+    print(f"{requests} requests from {concurrency} threads in {elapsed:.2f}s")
+    print(f"{requests / elapsed:.0f} requests per second")
+    print(f"{created} of {requests} proofs stored, {len(errors)} errors")
+    return created == requests and not errors
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Proof Wizard server client.")
+    parser.add_argument("--url", default=SERVER_URL)
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench_parser = commands.add_parser("bench", help="load test the server")
+    bench_parser.add_argument("--requests", type=int, default=2000)
+    bench_parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    if args.command == "bench":
+        return 0 if bench(args.url, args.requests, args.concurrency) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
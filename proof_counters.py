@@ -0,0 +1,129 @@
+"""
+File: proof_counters.py
+Purpose: Running totals of proofs per client, per user and per day. The counts
+are changed by each event as it is applied, and saved with the store, so they
+can be shown straight away without going through the proof lists.
+
+Example:
+    counters.summary(client="Client A", user="jsmith", day=today())
+    # {"pending_client": 3, "completed_client": 120, ...}
+
+"""
+
+import functools
+import time
+
+# Each kind of count and the parts of its key
+KINDS = {
+    "pending_client": ("client",),
+    "completed_client": ("client",),
+    "pending_user": ("user",),
+    "completed_user": ("user",),
+    "created_day": ("day",),
+    "completed_day": ("day",),
+    "completed_user_day": ("day", "user"),
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def _quarter_day(quarter):
+    return time.strftime("%Y-%m-%d", time.localtime(quarter * 900))
+
+
+def day_of(epoch):
+    """Returns the local "%Y-%m-%d" date of epoch seconds. Time zones move in
+    steps of 15 minutes, so the date is looked up once per quarter hour."""
+    return _quarter_day(epoch // 900)
+
+
+def today():
+    """Returns the local date as "%Y-%m-%d"."""
+    return time.strftime("%Y-%m-%d")
+
+
+def counter_key(kind, client=None, user=None, day=None):
+    """Returns the key of one count, or None if a part of it is not given."""
+    parts = {"client": client, "user": user, "day": day}
+    values = [parts[name] for name in KINDS[kind]]
+    if None in values:
+        return None
+    return " ".join(values)
+
+
+class ProofCounters:
+    """Proof counts by client, user and day, kept as {kind: {key: count}}.
+
+    Pending counts go down when a proof is completed or cancelled. Completed and
+    created counts are totals and stay the same when proofs are archived.
+    Pending proofs count for the user who created them, completed proofs for
+    the user who completed them.
+    """
+
+    def __init__(self, counts=None):
+        self.counts = {kind: {} for kind in KINDS}
+        for kind, values in (counts or {}).items():
+            if kind in self.counts:
+                self.counts[kind].update(values)
+
+    def copy(self):
+        """Returns a copy that later changes do not touch."""
+        return ProofCounters(self.counts)
+
+    def to_dict(self):
+        """Returns the counts for JSON."""
+        return self.counts
+
+    def get(self, kind, key):
+        """Returns one count."""
+        return self.counts[kind].get(key, 0)
+
+    def summary(self, client=None, user=None, day=None):
+        """Returns {kind: count} for every kind whose key parts are given."""
+        counts = {}
+        for kind in KINDS:
+            key = counter_key(kind, client, user, day)
+            if key is not None:
+                counts[kind] = self.get(kind, key)
+        return counts
+
+    def _change(self, kind, key, amount):
+        values = self.counts[kind]
+        count = values.get(key, 0) + amount
+        if count:
+            values[key] = count
+        else:
+            values.pop(key, None)
+
+    def _change_pending(self, proof, amount):
+        self._change("pending_client", proof.client, amount)
+        self._change("pending_user", proof.created_by, amount)
+
+    def _add_completed(self, proof):
+        day = day_of(proof.date_completed)
+        self._change("completed_client", proof.client, 1)
+        self._change("completed_user", proof.completed_by, 1)
+        self._change("completed_day", day, 1)
+        self._change("completed_user_day", f"{day} {proof.completed_by}", 1)
+
+    def added(self, proof):
+        """Counts a new proof, pending or already completed."""
+        self._change("created_day", day_of(proof.date_created), 1)
+        if proof.is_completed:
+            self._add_completed(proof)
+        else:
+            self._change_pending(proof, 1)
+
+    def completed(self, proof):
+        """Moves a proof from the pending to the completed counts. Takes the
+        completed copy."""
+        self._change_pending(proof, -1)
+        self._add_completed(proof)
+
+    def cancelled(self, proof):
+        """Takes a cancelled proof off the pending counts."""
+        self._change_pending(proof, -1)
+
+    def reassigned(self, proof, created_by):
+        """Moves a pending proof to another user's count."""
+        self._change("pending_user", proof.created_by, -1)
+        self._change("pending_user", created_by, 1)
@@ -0,0 +1,513 @@
+"""
+File: proof_db.py
+Purpose: Optional SQLite storage for proofs and clients. It offers the same
+methods as the journal based ProofStore, but filtering and sorting are done by
+indexed queries, so starting the program does not read the whole history. The
+database uses WAL mode so several workstations can share one file. The proof
+counts per client, user and day are kept in a table by triggers.
+
+Run "python proof_db.py migrate" to import the existing proof and client files.
+
+"""
+
+import argparse
+import sqlite3
+import time
+
+from proof_counters import ProofCounters
+from proof_record import Proof
+from proof_store import COMPLETED_COLUMNS, PENDING_COLUMNS, ProofStore
+
+DB_FILE = "proofs.db"
+PROOF_FIELDS = (
+    "id",
+    "client",
+    "proof_type",
+    "created_by",
+    "date_created",
+    "date_completed",
+    "completed_by",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proofs (
+    id INTEGER PRIMARY KEY,
+    client TEXT NOT NULL,
+    proof_type TEXT NOT NULL,
+    created_by TEXT NOT NULL,
+    date_created INTEGER NOT NULL,
+    date_completed INTEGER,
+    completed_by TEXT,
+    status TEXT NOT NULL DEFAULT 'pending'
+);
+CREATE INDEX IF NOT EXISTS idx_proofs_status_id ON proofs (status, id);
+CREATE INDEX IF NOT EXISTS idx_proofs_client ON proofs (status, client, id);
+CREATE INDEX IF NOT EXISTS idx_proofs_created_by ON proofs (status, created_by, id);
+CREATE INDEX IF NOT EXISTS idx_proofs_date_created
+    ON proofs (status, date_created, id);
+CREATE INDEX IF NOT EXISTS idx_proofs_date_completed
+    ON proofs (status, date_completed, id);
+CREATE INDEX IF NOT EXISTS idx_proofs_completed_by
+    ON proofs (status, completed_by, id);
+CREATE TABLE IF NOT EXISTS clients (
+    name TEXT PRIMARY KEY
+);
+"""
+
+# Same kinds and keys as ProofCounters
+COUNTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS proof_counts (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS proofs_count_created AFTER INSERT ON proofs
+BEGIN
+    INSERT INTO proof_counts VALUES
+        ('created_day', date(NEW.date_created, 'unixepoch', 'localtime'), 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS proofs_count_pending AFTER INSERT ON proofs
+WHEN NEW.status = 'pending'
+BEGIN
+    INSERT INTO proof_counts VALUES
+        ('pending_client', NEW.client, 1), ('pending_user', NEW.created_by, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS proofs_count_completed
+AFTER UPDATE OF status ON proofs
+WHEN OLD.status = 'pending' AND NEW.status = 'completed'
+BEGIN
+    INSERT INTO proof_counts VALUES
+        ('completed_client', NEW.client, 1),
+        ('completed_user', NEW.completed_by, 1),
+        ('completed_day', date(NEW.date_completed, 'unixepoch', 'localtime'), 1),
+        ('completed_user_day',
+            date(NEW.date_completed, 'unixepoch', 'localtime')
+            || ' ' || NEW.completed_by, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS proofs_count_inserted_completed AFTER INSERT ON proofs
+WHEN NEW.status = 'completed'
+BEGIN
+    INSERT INTO proof_counts VALUES
+        ('completed_client', NEW.client, 1),
+        ('completed_user', NEW.completed_by, 1),
+        ('completed_day', date(NEW.date_completed, 'unixepoch', 'localtime'), 1),
+        ('completed_user_day',
+            date(NEW.date_completed, 'unixepoch', 'localtime')
+            || ' ' || NEW.completed_by, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+END;
+CREATE TRIGGER IF NOT EXISTS proofs_count_left_pending
+AFTER UPDATE OF status ON proofs
+WHEN OLD.status = 'pending' AND NEW.status != 'pending'
+BEGIN
+    UPDATE proof_counts SET count = count - 1
+        WHERE (kind = 'pending_client' AND key = OLD.client)
+        OR (kind = 'pending_user' AND key = OLD.created_by);
+END;
+CREATE TRIGGER IF NOT EXISTS proofs_count_reassigned
+AFTER UPDATE OF created_by ON proofs
+WHEN OLD.status = 'pending' AND NEW.status = 'pending'
+BEGIN
+    UPDATE proof_counts SET count = count - 1
+        WHERE kind = 'pending_user' AND key = OLD.created_by;
+    INSERT INTO proof_counts VALUES ('pending_user', NEW.created_by, 1)
+        ON CONFLICT DO UPDATE SET count = count + 1;
+END;
+"""
+
+# Counts every proof in the table, for a database from before proof_counts
+REBUILD_COUNTS = """
+DELETE FROM proof_counts;
+INSERT INTO proof_counts
+    SELECT 'pending_client', client, COUNT(*) FROM proofs
+    WHERE status = 'pending' GROUP BY client;
+INSERT INTO proof_counts
+    SELECT 'pending_user', created_by, COUNT(*) FROM proofs
+    WHERE status = 'pending' GROUP BY created_by;
+INSERT INTO proof_counts
+    SELECT 'completed_client', client, COUNT(*) FROM proofs
+    WHERE status = 'completed' GROUP BY client;
+INSERT INTO proof_counts
+    SELECT 'completed_user', completed_by, COUNT(*) FROM proofs
+    WHERE status = 'completed' GROUP BY completed_by;
+INSERT INTO proof_counts
+    SELECT 'created_day', date(date_created, 'unixepoch', 'localtime'), COUNT(*)
+    FROM proofs GROUP BY 2;
+INSERT INTO proof_counts
+    SELECT 'completed_day', date(date_completed, 'unixepoch', 'localtime'), COUNT(*)
+    FROM proofs WHERE status = 'completed' GROUP BY 2;
+INSERT INTO proof_counts
+    SELECT 'completed_user_day',
+        date(date_completed, 'unixepoch', 'localtime') || ' ' || completed_by,
+        COUNT(*)
+    FROM proofs WHERE status = 'completed' GROUP BY 2;
+"""
+
+
+def connect(db_file=DB_FILE, check_same_thread=True):
+    """Opens the database in WAL mode and makes sure the tables exist."""
+    conn = sqlite3.connect(
+        db_file, timeout=30, check_same_thread=check_same_thread
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    conn.executescript(COUNTS_SCHEMA)
+    upgrade_counts(conn)
+    return conn
+
+
+def upgrade_counts(conn):
+    """Fills proof_counts for a database written before it existed."""
+    if conn.execute("PRAGMA user_version").fetchone()[0] >= 2:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        rebuild_counts(conn)
+        conn.execute("PRAGMA user_version = 2")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def rebuild_counts(conn):
+    """Counts the proofs again. Call it inside a transaction."""
+    for statement in REBUILD_COUNTS.split(";"):
+        if statement.strip():
+            conn.execute(statement)
+
+
+def row_to_proof(row):
+    """Turns a proofs row into a Proof."""
+    return Proof(**dict(zip(PROOF_FIELDS, row)))
+
+
+class SqliteProofView:
+    """A read-only sequence of proofs with one status, in a given sort order.
+
+    Slicing runs a LIMIT/OFFSET query, so only the requested rows are read.
+    """
+
+    def __init__(self, table, order_by):
+        self.table = table
+        self.order_by = order_by
+
+    def __len__(self):
+        return len(self.table)
+
+    def __iter__(self):
+        cursor = self.table.conn.execute(
+            f"SELECT {', '.join(PROOF_FIELDS)} FROM proofs "
+            f"WHERE status = ? ORDER BY {self.order_by}",
+            (self.table.status,),
+        )
+        return (row_to_proof(row) for row in cursor)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self))
+            return self._query(start, max(0, stop - start))
+        if index < 0:
+            index += len(self)
+        rows = self._query(index, 1)
+        if not rows:
+            raise IndexError(index)
+        return rows[0]
+
+    def _query(self, offset, limit):
+        """Reads one page of rows."""
+        cursor = self.table.conn.execute(
+            f"SELECT {', '.join(PROOF_FIELDS)} FROM proofs "
+            f"WHERE status = ? ORDER BY {self.order_by} LIMIT ? OFFSET ?",
+            (self.table.status, limit, offset),
+        )
+        return [row_to_proof(row) for row in cursor]
+
+
+class SqliteProofTable:
+    """The pending or completed proofs in the database, used like a ProofList."""
+
+    def __init__(self, conn, status, columns):
+        self.conn = conn
+        self.status = status
+        self.columns = tuple(columns)
+        self._count = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self.conn.execute(
+                "SELECT COUNT(*) FROM proofs WHERE status = ?", (self.status,)
+            ).fetchone()[0]
+        return self._count
+
+    def __iter__(self):
+        return iter(self.view())
+
+    def __contains__(self, proof_id):
+        return self.get(proof_id) is not None
+
+    def __getitem__(self, index):
+        return self.view()[index]
+
+    def changed(self):
+        """Forgets the cached row count after a write."""
+        self._count = None
+
+    def get(self, proof_id):
+        """Returns the proof with the given id, or None."""
+        row = self.conn.execute(
+            f"SELECT {', '.join(PROOF_FIELDS)} FROM proofs WHERE id = ? AND status = ?",
+            (proof_id, self.status),
+        ).fetchone()
+        return None if row is None else row_to_proof(row)
+
+    def view(self, sort_keys=()):
+        """Returns the proofs sorted by a list of (column, descending) pairs."""
+        terms = []
+        for column, descending in sort_keys:
+            if column not in self.columns:
+                raise ValueError(f"Column '{column}' is not sortable.")
+            terms.append(f"{column} {'DESC' if descending else 'ASC'}")
+        # Ties keep insertion order, reversed when the first column is descending
+        first_descending = bool(sort_keys) and sort_keys[0][1]
+        terms.append("id DESC" if first_descending else "id ASC")
+        return SqliteProofView(self, ", ".join(terms))
+
+
+class SqliteProofCounters(ProofCounters):
+    """ProofCounters read from the proof_counts table. The triggers keep the
+    table up to date, so every lookup sees other connections' changes."""
+
+    def __init__(self, conn):
+        super().__init__()
+        self.conn = conn
+
+    def get(self, kind, key):
+        """Returns one count."""
+        row = self.conn.execute(
+            "SELECT count FROM proof_counts WHERE kind = ? AND key = ?", (kind, key)
+        ).fetchone()
+        return 0 if row is None else row[0]
+
+
+class SqliteProofStore:
+    """Proof storage in a SQLite database with the same methods as ProofStore.
+
+    Writes are grouped into transactions that are committed every batch_size
+    changes or batch_interval seconds, or when flush() is called. The readers
+    share the one connection, so commits run on the calling thread and writer
+    is not used. In WAL mode with synchronous=NORMAL a commit does not fsync.
+    """
+
+    # The connection must not be used from two threads at once
+    thread_safe = False
+
+    def __init__(self, db_file=DB_FILE, batch_size=50, batch_interval=2.0):
+        self.db_file = db_file
+        self.loaded = True
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.writer = None
+        self.conn = None
+        self.pending = None
+        self.completed = None
+        self.counters = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._data_version = None
+
+    def load(self):
+        """Opens the database. No proofs are read until they are displayed."""
+        self.conn = connect(self.db_file, check_same_thread=False)
+        self.pending = SqliteProofTable(self.conn, "pending", PENDING_COLUMNS)
+        self.completed = SqliteProofTable(self.conn, "completed", COMPLETED_COLUMNS)
+        self.counters = SqliteProofCounters(self.conn)
+        return self
+
+    def load_pending(self):
+        """Same as load(), the database does not need a separate history pass."""
+        return self.load()
+
+    def read_completed_pages(self, page_size=5000):
+        """Yields nothing, completed proofs are queried when they are shown."""
+        return iter(())
+
+    def add_completed_page(self, page):
+        """Nothing to add, see read_completed_pages()."""
+
+    def finish_loading(self):
+        """Nothing to finish, see read_completed_pages()."""
+
+    def _changed(self, count=1):
+        """Counts a write and commits when the batch is full."""
+        self.pending.changed()
+        self.completed.changed()
+        self._unsynced += count
+        if (
+            self._unsynced >= self.batch_size
+            or time.monotonic() - self._last_sync >= self.batch_interval
+        ):
+            self.request_flush()
+
+    def add_proof(self, proof):
+        """Adds a new proof and gives it an id. Proofs with a completion date go
+        straight to the completed list."""
+        status = "completed" if proof.is_completed else "pending"
+        cursor = self.conn.execute(
+            "INSERT INTO proofs (client, proof_type, created_by, date_created, "
+            "date_completed, completed_by, status) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                proof.client,
+                proof.proof_type,
+                proof.created_by,
+                proof.date_created,
+                proof.date_completed,
+                proof.completed_by,
+                status,
+            ),
+        )
+        proof = proof.with_id(cursor.lastrowid)
+        self._changed()
+        return proof
+
+    def add_proofs(self, proofs):
+        """Adds several new proofs. Returns them with their ids."""
+        return [self.add_proof(proof) for proof in proofs]
+
+    def complete_proofs(self, proof_ids, completed_by, date_completed):
+        """Moves pending proofs to the completed list."""
+        proof_ids = [proof_id for proof_id in proof_ids if proof_id in self.pending]
+        self.conn.executemany(
+            "UPDATE proofs SET status = 'completed', date_completed = ?, "
+            "completed_by = ? WHERE id = ? AND status = 'pending'",
+            [(date_completed, completed_by, proof_id) for proof_id in proof_ids],
+        )
+        self._changed(len(proof_ids))
+        return proof_ids
+
+    def cancel_proofs(self, proof_ids):
+        """Removes pending proofs without completing them."""
+        proof_ids = [proof_id for proof_id in proof_ids if proof_id in self.pending]
+        self.conn.executemany(
+            "UPDATE proofs SET status = 'cancelled' WHERE id = ? AND status = 'pending'",
+            [(proof_id,) for proof_id in proof_ids],
+        )
+        self._changed(len(proof_ids))
+        return proof_ids
+
+    def reassign_proofs(self, proof_ids, created_by):
+        """Gives pending proofs to another user."""
+        proof_ids = [proof_id for proof_id in proof_ids if proof_id in self.pending]
+        self.conn.executemany(
+            "UPDATE proofs SET created_by = ? WHERE id = ? AND status = 'pending'",
+            [(created_by, proof_id) for proof_id in proof_ids],
+        )
+        self._changed(len(proof_ids))
+        return proof_ids
+
+    def archive_candidates(self, cutoff):
+        """Returns the completed proofs completed before the cutoff date."""
+        cursor = self.conn.execute(
+            f"SELECT {', '.join(PROOF_FIELDS)} FROM proofs WHERE status = 'completed' "
+            "AND date_completed < ? ORDER BY date_completed, id",
+            (cutoff,),
+        )
+        return [row_to_proof(row) for row in cursor]
+
+    def archive_proofs(self, proof_ids):
+        """Deletes completed proofs that have been written to the archive."""
+        proof_ids = [proof_id for proof_id in proof_ids if proof_id in self.completed]
+        self.conn.executemany(
+            "DELETE FROM proofs WHERE id = ? AND status = 'completed'",
+            [(proof_id,) for proof_id in proof_ids],
+        )
+        self._changed(len(proof_ids))
+        return proof_ids
+
+    def refresh(self):
+        """Checks whether another connection committed changes. Returns True if
+        so, after forgetting the cached row counts."""
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = self._data_version is not None and version != self._data_version
+        self._data_version = version
+        if changed:
+            self.pending.changed()
+            self.completed.changed()
+        return changed
+
+    def request_flush(self):
+        """Commits the current transaction, see the class docstring."""
+        self.flush()
+
+    def flush(self):
+        """Commits the current transaction."""
+        if self.conn is not None:
+            self.conn.commit()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def compact(self):
+        """Commits and folds the WAL file back into the database."""
+        self.flush()
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        """Commits and closes the database."""
+        if self.conn is not None:
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+
+def migrate(db_file=DB_FILE, clients_file="clients.json"):
+    """Copies the proofs from the journal store (or the old pending.json and
+    completed.json files) and the client list into the database."""
+    # Imported here because client_manager imports this module
+    from client_manager import ClientManager
+
+    store = ProofStore().load()
+    conn = connect(db_file)
+    with conn:
+        for status, proofs in (
+            ("pending", store.pending),
+            ("completed", store.completed),
+        ):
+            conn.executemany(
+                "INSERT OR REPLACE INTO proofs (id, client, proof_type, created_by, "
+                "date_created, date_completed, completed_by, status) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    tuple(getattr(proof, field) for field in PROOF_FIELDS) + (status,)
+                    for proof in proofs
+                ),
+            )
+        rebuild_counts(conn)  # INSERT OR REPLACE counts a copied proof twice
+        conn.executemany(
+            "INSERT OR IGNORE INTO clients (name) VALUES (?)",
+            ((client,) for client in ClientManager(clients_file).get_clients()),
+        )
+    store.close()
+    conn.close()
+    return len(store.pending), len(store.completed)
+
+
+def main():
+    """Command line entry point for database maintenance."""
+    parser = argparse.ArgumentParser(description="Proof Wizard database tools.")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("--db", default=DB_FILE, help="database file to use")
+    parser.add_argument("--clients", default="clients.json", help="client list file")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        pending, completed = migrate(args.db, args.clients)
+        print(f"Imported {pending} pending and {completed} completed proofs.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+File: proof_engine.py
+Purpose: The proof lifecycle without any tkinter code. Creating, completing,
+cancelling and exporting proofs lives here so the GUI, the command line tool and
+other programs all share the same rules.
+
+"""
+
+import getpass
+import itertools
+import os
+
+from proof_db import SqliteProofStore
+from proof_record import Proof, parse_date, timestamp
+from proof_store import ProofStore
+
+PROOF_TYPES = ("Generic", "Approval")
+IMPORT_BATCH_SIZE = 5000
+
+
+def current_user():
+    """Gets the user name from the OS, also when there is no login terminal."""
+    try:
+        return os.getlogin()
+    except OSError:
+        return getpass.getuser()
+
+
+def open_store(db_file=None):
+    """Creates the journal store, or the SQLite store when a db file is given.
+    The store is not loaded yet."""
+    if db_file:
+        return SqliteProofStore(db_file)
+    return ProofStore()
+
+
+class ProofEngine:
+    """Proof operations on top of a proof store, acting as one user."""
+
+    def __init__(self, store, user=None):
+        self.store = store
+        self.user = user or current_user()
+
+    def new_proof(self, client, proof_type, created_by=None, date_created=None):
+        """Builds a Proof. Approval proofs start pending, any other type is
+        completed straight away. date_created may be epoch seconds or a
+        "%Y-%m-%d %H:%M:%S" string."""
+        client = (client or "").strip()
+        if not client:
+            raise ValueError("Please select a client.")
+        if proof_type not in PROOF_TYPES:
+            raise ValueError(f"Proof type must be one of: {', '.join(PROOF_TYPES)}.")
+
+        created_by = created_by or self.user
+        try:
+            date_created = parse_date(date_created) or timestamp()
+        except ValueError:
+            raise ValueError(f"Invalid date: {date_created}") from None
+        proof = Proof(client, proof_type, created_by, date_created)
+        if proof_type != "Approval":
+            proof = proof.completed(created_by, date_created)
+        return proof
+
+    def create_proof(self, client, proof_type, created_by=None, date_created=None):
+        """Creates one proof and returns it with its id."""
+        return self.store.add_proof(
+            self.new_proof(client, proof_type, created_by, date_created)
+        )
+
+    def create_proofs(self, rows):
+        """Creates a proof for each dict in rows (client, proof_type and
+        optionally created_by and date_created). Returns the new proofs."""
+        proofs = [
+            self.new_proof(
+                row.get("client"),
+                row.get("proof_type") or "Approval",
+                row.get("created_by"),
+                row.get("date_created"),
+            )
+            for row in rows
+        ]
+        # Check every row before writing any of them
+        return self.store.add_proofs(proofs)
+
+    def import_proofs(self, proofs, batch_size=IMPORT_BATCH_SIZE):
+        """Adds existing proofs, for example read from an export, keeping their
+        dates and completion. They are added in batches so a long iterator never
+        has to be held in memory at once. The store gives them new ids. Returns
+        the count."""
+        proofs = iter(proofs)
+        count = 0
+        while True:
+            batch = list(itertools.islice(proofs, batch_size))
+            if not batch:
+                return count
+            self.store.add_proofs(batch)
+            count += len(batch)
+
+    def complete_proofs(self, proof_ids, date_completed=None):
+        """Completes the pending proofs with the given ids. Returns the ids that
+        were pending."""
+        return self.store.complete_proofs(
+            proof_ids, self.user, parse_date(date_completed) or timestamp()
+        )
+
+    def cancel_proofs(self, proof_ids):
+        """Cancels the pending proofs with the given ids."""
+        return self.store.cancel_proofs(proof_ids)
+
+    def reassign_proofs(self, proof_ids, created_by):
+        """Gives the pending proofs with the given ids to another user. Returns
+        the ids that were pending."""
+        created_by = (created_by or "").strip()
+        if not created_by:
+            raise ValueError("Please enter a user to reassign the proofs to.")
+        return self.store.reassign_proofs(proof_ids, created_by)
+
+    def find_pending(self, client=None, created_by=None, before=None, after=None):
+        """Returns pending proofs matching every filter that is given. Dates are
+        compared to date_created, before is exclusive and after is inclusive.
+        They can be epoch seconds or the start of a date string like
+        "2024-10-01"."""
+        before = parse_date(before)
+        after = parse_date(after)
+        matches = []
+        for proof in self.store.pending:
+            if client is not None and proof.client != client:
+                continue
+            if created_by is not None and proof.created_by != created_by:
+                continue
+            if before is not None and proof.date_created >= before:
+                continue
+            if after is not None and proof.date_created < after:
+                continue
+            matches.append(proof)
+        return matches
+
+    def export(self, status="completed", sort_keys=()):
+        """Yields the pending or completed proofs (or both, for "all")."""
+        if status in ("pending", "all"):
+            yield from self.store.pending.view(sort_keys)
+        if status in ("completed", "all"):
+            yield from self.store.completed.view(sort_keys)
@@ -0,0 +1,515 @@
+"""
+File: proof_index.py
+Purpose: In-memory list of proofs indexed by proof id and by sortable column.
+Looking up, adding and removing a proof by id does not have to scan the whole
+list, and sorting by a column just walks a pre-sorted index.
+
+"""
+
+import heapq
+import threading
+from bisect import bisect_left
+from itertools import filterfalse, groupby
+from operator import attrgetter
+
+# Removing or inserting fewer ids than this in a sorted list goes one at a
+# time, more rebuild the list in one pass
+REMOVE_BATCH_SIZE = 64
+# Lists with background_sorts set sort on another thread from this size
+BACKGROUND_SORT_SIZE = 20000
+# Records sorted by one C call on that thread, which holds the GIL meanwhile
+SORT_CHUNK_SIZE = 4096
+# A background sort is started again if more records than this changed
+# while it ran, instead of moving them all into place on the calling thread
+CATCH_UP_SIZE = 250
+
+
+def sorted_ids(records, column):
+    """Returns the ids of records sorted by (column value, id)."""
+    records = sorted(records, key=attrgetter("id"))
+    records.sort(key=attrgetter(column))  # Stable, so equal values stay by id
+    return list(map(attrgetter("id"), records))
+
+
+def _delete_positions(items, positions):
+    """Deletes the items at ascending positions from a list in place."""
+    if len(positions) < REMOVE_BATCH_SIZE:
+        for position in reversed(positions):
+            del items[position]
+        return
+    kept = []
+    start = 0
+    for position in positions:
+        kept += items[start:position]
+        start = position + 1
+    kept += items[start:]
+    items[:] = kept
+
+
+def _insert_ids(ids, new_ids, sort_key):
+    """Inserts new ids into a list of ids sorted by sort_key, in place."""
+    if len(new_ids) < REMOVE_BATCH_SIZE:
+        for proof_id in new_ids:
+            ids.insert(bisect_left(ids, sort_key(proof_id), key=sort_key), proof_id)
+        return
+    merged = []
+    start = 0
+    for proof_id in sorted(new_ids, key=sort_key):
+        position = bisect_left(ids, sort_key(proof_id), start, key=sort_key)
+        merged += ids[start:position]
+        merged.append(proof_id)
+        start = position
+    merged += ids[start:]
+    ids[:] = merged
+
+
+def _sorted(items, key, reverse=False):
+    """sorted() taking its key the way _sorted_in_chunks() does."""
+    return sorted(items, key=key, reverse=reverse)
+
+
+def _sorted_in_chunks(items, key, reverse=False):
+    """A stable sort like sorted() for a background thread. One sort of a long
+    list is a single C call that holds the GIL and stops the tkinter thread
+    until it is done, so chunks are sorted and merged instead."""
+    chunks = [
+        sorted(items[start : start + SORT_CHUNK_SIZE], key=key, reverse=reverse)
+        for start in range(0, len(items), SORT_CHUNK_SIZE)
+    ]
+    return list(heapq.merge(*chunks, key=key, reverse=reverse))
+
+
+def _sort_runs(records, sort_keys, sort=_sorted):
+    """Returns records already sorted by (first column, id) sorted by all of
+    sort_keys. Only runs of equal first values are sorted again, so ties on
+    every column stay ordered by id, descending if the first column is."""
+    first_column, first_descending = sort_keys[0]
+    if first_descending:
+        records.reverse()
+    ordered = []
+    for _, run in groupby(records, key=attrgetter(first_column)):
+        run = list(run)
+        if len(run) > 1:
+            # Stable sorts from the last key to the first give a multi-key sort
+            for column, descending in reversed(sort_keys[1:]):
+                run = sort(run, attrgetter(column), descending)
+        ordered.extend(run)
+    return ordered
+
+
+def _index_record_key(column):
+    """Returns a key function of a record giving the order of a column index."""
+    value = attrgetter(column)
+    return lambda record: (value(record), record.id)
+
+
+def _multi_sort_record_key(sort_keys):
+    """Returns a key function of a record giving the order of _sort_runs()."""
+    first_descending = sort_keys[0][1]
+    # Multi-column sorts have at least two keys, so this returns a tuple
+    values = attrgetter(*(column for column, _ in sort_keys))
+
+    def sort_key(record):
+        key = [
+            _Descending(value) if descending else value
+            for value, (_, descending) in zip(values(record), sort_keys)
+        ]
+        key.append(_Descending(record.id) if first_descending else record.id)
+        return tuple(key)
+
+    return sort_key
+
+
+def _sort_in_background(records, keys, results):
+    """Thread target for ProofList._sort_later(): sorts the records for each
+    column index or multi-column order in keys."""
+    by_id = _sorted_in_chunks(records, attrgetter("id"))
+    for key in keys:
+        if isinstance(key, str):
+            ordered = _sorted_in_chunks(by_id, attrgetter(key))
+        else:
+            ordered = _sorted_in_chunks(by_id, attrgetter(key[0][0]))
+            ordered = _sort_runs(ordered, key, _sorted_in_chunks)
+        results[key] = [record.id for record in ordered]
+
+
+class _Descending:
+    """Wraps a sort value so that it compares in reverse order."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return other.value < self.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+class ProofView:
+    """A read-only sequence of records in the order of a list of ids.
+
+    When reverse is set the ids are walked from the end, so a descending sort
+    does not need its own copy of the index.
+    """
+
+    def __init__(self, records, ids, reverse=False):
+        self._records = records
+        self._ids = ids
+        self._reverse = reverse
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        ids = reversed(self._ids) if self._reverse else self._ids
+        return (self._records[proof_id] for proof_id in ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, _ = index.indices(len(self._ids))
+            if self._reverse:
+                count = len(self._ids)
+                ids = self._ids[count - stop : count - start][::-1]
+            else:
+                ids = self._ids[start:stop]
+            return [self._records[proof_id] for proof_id in ids]
+        if self._reverse:
+            index = len(self._ids) - 1 - index if index >= 0 else -1 - index
+        return self._records[self._ids[index]]
+
+
+class ProofList:
+    """An ordered list of proof records with a dictionary index on the proof id.
+
+    Records are kept in a dict keyed by id, and the insertion order is a list of
+    ids. Positions of ids in that list are cached and only recomputed from the
+    first position that changed. Each sortable column gets a list of ids sorted
+    by (value, id) the first time it is used, which is then kept up to date on
+    every append and removal.
+
+    Set background_sorts to build indexes and multi-column orders of a large
+    list on other threads, and call finish_sorts() from time to time on the
+    thread that uses the list to put them in place.
+    """
+
+    def __init__(self, records=(), columns=()):
+        self.columns = tuple(columns)
+        self.background_sorts = False
+        self._records = {}
+        self._order = []
+        self._positions = {}
+        self._valid = 0
+        self._indexes = {}
+        self._multi_sort = None
+        self._wanted_multi_sort = None
+        self._sorting = {}  # {index column or sort keys: (thread, result)}
+        # {thread: {id: record before the first change, None if added}} for
+        # the records changed while each thread sorts
+        self._changed = {}
+        for record in records:
+            self.append(record)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        records = self._records
+        return (records[proof_id] for proof_id in self._order)
+
+    def __contains__(self, proof_id):
+        return proof_id in self._records
+
+    def __getitem__(self, index):
+        records = self._records
+        if isinstance(index, slice):
+            return [records[proof_id] for proof_id in self._order[index]]
+        return records[self._order[index]]
+
+    def clear(self):
+        """Removes every record."""
+        self._records = {}
+        self._order = []
+        self._positions = {}
+        self._valid = 0
+        self._indexes = {}
+        self._multi_sort = None
+        self._sorting = {}
+        self._changed = {}
+
+    def get(self, proof_id):
+        """Returns the record with the given id, or None."""
+        return self._records.get(proof_id)
+
+    def position(self, proof_id):
+        """Returns where the record with the given id sits in the list."""
+        if proof_id not in self._records:
+            return None
+        position = self._positions.get(proof_id)
+        if position is None or position >= self._valid:
+            for index in range(self._valid, len(self._order)):
+                self._positions[self._order[index]] = index
+            self._valid = len(self._order)
+            position = self._positions[proof_id]
+        return position
+
+    def append(self, record):
+        """Adds a record to the end of the list."""
+        proof_id = record.id
+        if proof_id in self._records:
+            raise ValueError(f"Proof {proof_id} is already in the list.")
+        self._records[proof_id] = record
+        if self._valid == len(self._order):
+            self._positions[proof_id] = len(self._order)
+            self._valid += 1
+        self._order.append(proof_id)
+        self._insert_sorted(proof_id)
+        for changed in self._changed.values():
+            changed.setdefault(proof_id, None)
+
+    def _insert_sorted(self, proof_id):
+        """Adds an id to the column indexes and the cached multi-column order."""
+        for column, ids in self._indexes.items():
+            sort_key = self._sort_key(column)
+            ids.insert(bisect_left(ids, sort_key(proof_id), key=sort_key), proof_id)
+        if self._multi_sort is not None:
+            sort_keys, ids = self._multi_sort
+            sort_key = self._multi_sort_key(sort_keys)
+            ids.insert(bisect_left(ids, sort_key(proof_id), key=sort_key), proof_id)
+
+    def _remove_sorted(self, proof_id):
+        """Removes an id from the column indexes and the cached multi-column
+        order. The record must still be in the list."""
+        for column, ids in self._indexes.items():
+            sort_key = self._sort_key(column)
+            del ids[bisect_left(ids, sort_key(proof_id), key=sort_key)]
+        if self._multi_sort is not None:
+            sort_keys, ids = self._multi_sort
+            sort_key = self._multi_sort_key(sort_keys)
+            del ids[bisect_left(ids, sort_key(proof_id), key=sort_key)]
+
+    def replace_many(self, records):
+        """Swaps in changed copies of records already in the list, keeping their
+        place in the insertion order. Returns the records that were replaced."""
+        replaced = []
+        for record in records:
+            if record.id not in self._records:
+                continue
+            for changed in self._changed.values():
+                changed.setdefault(record.id, self._records[record.id])
+            self._remove_sorted(record.id)
+            self._records[record.id] = record
+            self._insert_sorted(record.id)
+            replaced.append(record)
+        return replaced
+
+    def pop(self, proof_id):
+        """Removes and returns the record with the given id, or None."""
+        position = self.position(proof_id)
+        if position is None:
+            return None
+        self._remove_sorted(proof_id)
+
+        del self._order[position]
+        del self._positions[proof_id]
+        self._valid = min(self._valid, position)
+        for changed in self._changed.values():
+            changed.setdefault(proof_id, self._records[proof_id])
+        return self._records.pop(proof_id)
+
+    def pop_many(self, proof_ids):
+        """Removes the records with the given ids and returns them. They are
+        found in the sorted lists with bisect, so nothing is sorted again."""
+        records = self._records
+        proof_ids = [
+            proof_id for proof_id in dict.fromkeys(proof_ids) if proof_id in records
+        ]
+        if not proof_ids:
+            return []
+        for changed in self._changed.values():
+            for proof_id in proof_ids:
+                changed.setdefault(proof_id, records[proof_id])
+        sorted_lists = [
+            (ids, self._sort_key(column)) for column, ids in self._indexes.items()
+        ]
+        if self._multi_sort is not None:
+            sort_keys, ids = self._multi_sort
+            sorted_lists.append((ids, self._multi_sort_key(sort_keys)))
+        for ids, sort_key in sorted_lists:
+            positions = sorted(
+                bisect_left(ids, sort_key(proof_id), key=sort_key)
+                for proof_id in proof_ids
+            )
+            _delete_positions(ids, positions)
+
+        if len(proof_ids) < REMOVE_BATCH_SIZE:
+            positions = sorted(map(self.position, proof_ids))
+            _delete_positions(self._order, positions)
+            for proof_id in proof_ids:
+                del self._positions[proof_id]
+            self._valid = min(self._valid, positions[0])
+        else:
+            self._order[:] = filterfalse(set(proof_ids).__contains__, self._order)
+            self._positions = {}
+            self._valid = 0
+        return [records.pop(proof_id) for proof_id in proof_ids]
+
+    def view(self, sort_keys=()):
+        """Returns the records as a sequence sorted by a list of (column,
+        descending) pairs. With no sort keys the insertion order is used.
+
+        With background_sorts set, an order that still has to be sorted is
+        started on another thread and the first column's order, or the
+        insertion order, is returned until finish_sorts() puts it in place.
+        """
+        sort_keys = tuple(sort_keys)
+        if not sort_keys:
+            return ProofView(self._records, self._order)
+        for column, _ in sort_keys:
+            if column not in self.columns:
+                raise ValueError(f"Column '{column}' is not sortable.")
+        if len(sort_keys) > 1:
+            self._wanted_multi_sort = sort_keys
+            if self._multi_sort is None or self._multi_sort[0] != sort_keys:
+                if not self._sort_later([sort_keys]):
+                    self._multi_sort = (sort_keys, self._sort_multi(sort_keys))
+            if self._multi_sort is not None and self._multi_sort[0] == sort_keys:
+                return ProofView(self._records, self._multi_sort[1])
+
+        column, descending = sort_keys[0]
+        if column not in self._indexes and self._sort_later([column]):
+            return ProofView(self._records, self._order)
+        return ProofView(self._records, self.index(column), descending)
+
+    def index(self, column):
+        """Returns the ids sorted by (value, id) for a column, building it once."""
+        ids = self._indexes.get(column)
+        if ids is None:
+            if column not in self.columns:
+                raise ValueError(f"Column '{column}' is not sortable.")
+            ids = self._indexes[column] = sorted_ids(self._records.values(), column)
+        return ids
+
+    def prepare_indexes(self):
+        """Builds the column indexes that are missing before they are first
+        used, on another thread when background_sorts is set."""
+        columns = [column for column in self.columns if column not in self._indexes]
+        if not self._sort_later(columns):
+            for column in columns:
+                self.index(column)
+
+    def _sort_later(self, keys):
+        """Starts building column indexes (a key is a column) or multi-column
+        orders (a key is the sort keys) on another thread. Returns False if the
+        list is to be sorted right away instead."""
+        if not self.background_sorts or len(self._records) < BACKGROUND_SORT_SIZE:
+            return False
+        keys = [key for key in keys if key not in self._sorting]
+        if keys:
+            results = {}
+            thread = threading.Thread(
+                target=_sort_in_background,
+                args=(list(self._records.values()), keys, results),
+                daemon=True,
+            )
+            self._changed[thread] = {}
+            for key in keys:
+                self._sorting[key] = (thread, results)
+            thread.start()
+        return True
+
+    def finish_sorts(self):
+        """Puts the indexes and orders sorted on other threads in place, with
+        the records changed since then moved with bisect. Returns True if any
+        were put in place."""
+        finished = [
+            key for key, (thread, _) in self._sorting.items() if not thread.is_alive()
+        ]
+        installed = False
+        for key in finished:
+            thread, results = self._sorting.pop(key)
+            ids = results.get(key)
+            if ids is None:
+                continue  # The thread failed, the next view() tries again
+            if isinstance(key, str):
+                if key in self._indexes:
+                    continue
+                record_key = _index_record_key(key)
+            elif key == self._wanted_multi_sort:
+                record_key = _multi_sort_record_key(key)
+            else:
+                continue
+            if len(self._changed[thread]) > CATCH_UP_SIZE:
+                self._sort_later([key])
+                continue
+            ids = self._catch_up_sort(ids, self._changed[thread], record_key)
+            if isinstance(key, str):
+                self._indexes[key] = ids
+            else:
+                self._multi_sort = (key, ids)
+            installed = True
+        running = {thread for thread, _ in self._sorting.values()}
+        self._changed = {
+            thread: changed
+            for thread, changed in self._changed.items()
+            if thread in running
+        }
+        return installed
+
+    def _catch_up_sort(self, ids, changed, record_key):
+        """Brings ids sorted on another thread up to date with the records that
+        were added, removed or replaced since. Both are found with bisect, the
+        old ones by the copies kept in changed."""
+        if not changed:
+            return ids
+        records = self._records
+
+        def sorted_key(proof_id):
+            # The key the thread sorted by, before any change
+            record = changed.get(proof_id)
+            return record_key(records[proof_id] if record is None else record)
+
+        positions = []
+        for proof_id, record in changed.items():
+            if record is not None:
+                position = bisect_left(ids, record_key(record), key=sorted_key)
+                if position < len(ids) and ids[position] == proof_id:
+                    positions.append(position)
+        positions.sort()
+        _delete_positions(ids, positions)
+
+        def sort_key(proof_id):
+            return record_key(records[proof_id])
+
+        _insert_ids(ids, list(filter(records.__contains__, changed)), sort_key)
+        return ids
+
+    def below(self, column, value):
+        """Returns the records whose column value is less than value, in order."""
+        records = self._records
+        column_value = attrgetter(column)
+        ids = self.index(column)
+        stop = bisect_left(
+            ids, value, key=lambda proof_id: column_value(records[proof_id])
+        )
+        return [records[proof_id] for proof_id in ids[:stop]]
+
+    def _sort_key(self, column):
+        """Returns the (value, id) key function used by a column index."""
+        records = self._records
+        record_key = _index_record_key(column)
+        return lambda proof_id: record_key(records[proof_id])
+
+    def _multi_sort_key(self, sort_keys):
+        """Returns a key function giving the same order as _sort_multi, used to
+        keep the cached multi-column order up to date with bisect."""
+        records = self._records
+        record_key = _multi_sort_record_key(sort_keys)
+        return lambda proof_id: record_key(records[proof_id])
+
+    def _sort_multi(self, sort_keys):
+        """Sorts by several columns, starting from the first column's index."""
+        records = list(map(self._records.__getitem__, self.index(sort_keys[0][0])))
+        return [record.id for record in _sort_runs(records, sort_keys)]
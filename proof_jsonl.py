@@ -0,0 +1,183 @@
+"""
+File: proof_jsonl.py
+Purpose: Streaming reads and writes of proof files. JSON Lines files hold one
+proof per line, so they are read one line at a time and new proofs are appended
+to the end. The old indented JSON array files (pending.json, completed.json) are
+decoded one record at a time as well, so neither needs the whole file in memory.
+
+Example:
+    for proof in read_proofs("completed.json"):
+        ...
+    convert_to_jsonl("completed.json", "completed.jsonl")
+
+"python proof_jsonl.py" checks the array reader with every small chunk size.
+
+"""
+
+import gzip
+import io
+import json
+import os
+import re
+import sys
+
+from proof_record import Proof
+
+CHUNK_SIZE = 64 * 1024
+_whitespace = re.compile(r"[\s,]*")
+# What may follow an array item, and what may still be the rest of a number
+_delimiter = re.compile(r"[\s,\]]")
+_number_tail = re.compile(r"[0-9.eE+-]*\Z")
+
+# Arrays that are easy to split in the wrong place, for check_chunk_sizes()
+CHECK_ARRAYS = (
+    "[1.5]",
+    "[1, -3.5e10]",
+    ' [ {"a": "x,]"} , [true, null], -0.25E-3 ,"\\u00e9", 12 ] ',
+    "[[], {}, 0, 1e5, 100]",
+    "[]",
+)
+
+
+def open_text(filename, mode="r", compressed=None):
+    """Opens a text file, gzip compressed if the name ends in .gz."""
+    if compressed is None:
+        compressed = filename.endswith(".gz")
+    if compressed:
+        return gzip.open(filename, mode + "t", encoding="utf-8")
+    return open(filename, mode, encoding="utf-8", newline="")
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Yields the items of a JSON array from an open text file, reading it in
+    chunks. Only the unread part of the current chunk is kept in memory."""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+    opened = False
+    while True:
+        position = _whitespace.match(buffer, position).end()
+        if position == len(buffer):
+            if eof:
+                raise ValueError("The JSON array is not closed.")
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        if not opened:
+            if buffer[position] != "[":
+                raise ValueError("The file does not hold a JSON array.")
+            opened = True
+            position += 1
+            continue
+        if buffer[position] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            end = None
+        if end is not None and _delimiter.match(buffer, end):
+            yield item
+            position = end
+            continue
+        # An item only counts once what follows it is read, "1." may be "1.5"
+        if eof:
+            if end == len(buffer):
+                raise ValueError("The JSON array is not closed.")
+            raise ValueError("Expected ',' or ']' after an array item.")
+        if end is not None and not _number_tail.match(buffer, end):
+            raise ValueError("Expected ',' or ']' after an array item.")
+        # The item runs past the end of the buffer, read more and try again.
+        # Reading at least as much as is buffered keeps big items linear.
+        chunk = file.read(max(chunk_size, len(buffer) - position))
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def iter_records(filename):
+    """Yields the dicts in a JSON Lines file or a JSON array file. The format is
+    told apart by the first character."""
+    with open_text(filename) as file:
+        first = " "
+        while first.isspace():
+            first = file.read(1)
+        file.seek(0)
+        if first == "[":
+            yield from iter_json_array(file)
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def read_proofs(filename):
+    """Yields the proofs in a JSON Lines or JSON array file."""
+    for record in iter_records(filename):
+        try:
+            proof = Proof.from_dict(record)
+        except (KeyError, TypeError) as error:
+            raise ValueError(f"Invalid proof record in {filename}: {error}") from None
+        yield proof
+
+
+def write_jsonl(output, proofs):
+    """Writes proofs to an open file, one compact JSON line each. Returns the
+    count."""
+    count = 0
+    for proof in proofs:
+        output.write(json.dumps(proof.to_dict(), separators=(",", ":")) + "\n")
+        count += 1
+    return count
+
+
+def append_jsonl(filename, proofs):
+    """Appends proofs to the end of a JSON Lines file. Returns the count."""
+    with open_text(filename, "a") as output:
+        return write_jsonl(output, proofs)
+
+
+def convert_to_jsonl(source, target):
+    """Converts a JSON array (or JSON Lines) proof file to JSON Lines. The new file
+    is written under a temporary name and renamed when complete. Returns the
+    count."""
+    temp_file = target + ".tmp"
+    try:
+        with open_text(temp_file, "w", target.endswith(".gz")) as output:
+            count = write_jsonl(output, read_proofs(source))
+        os.replace(temp_file, target)
+    except BaseException:
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        raise
+    return count
+
+
+def check_chunk_sizes(texts=CHECK_ARRAYS, max_chunk_size=16):
+    """Reads each JSON array text with every chunk size up to max_chunk_size
+    and compares the items with json.loads(). Returns the (text, chunk size)
+    pairs that came out wrong."""
+    failures = []
+    for text in texts:
+        expected = json.loads(text)
+        for chunk_size in range(1, max_chunk_size + 1):
+            try:
+                items = list(iter_json_array(io.StringIO(text), chunk_size))
+            except ValueError:
+                items = None
+            if items != expected:
+                failures.append((text, chunk_size))
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check_chunk_sizes()
+    for text, chunk_size in failures:
+        print(f"Wrong items for {text!r} read {chunk_size} characters at a time.")
+    if not failures:
+        print(f"All {len(CHECK_ARRAYS)} arrays read correctly with every chunk size.")
+    sys.exit(1 if failures else 0)
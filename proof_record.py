@@ -0,0 +1,124 @@
+"""
+File: proof_record.py
+Purpose: The Proof record type. A proof is a small slotted dataclass instead of a
+dict, dates are whole epoch seconds instead of formatted strings, and client and
+user names are shared through a string table, so a large proof history takes
+much less memory and date sorts compare integers.
+
+"""
+
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_strings = {}
+
+
+def intern(text):
+    """Returns the shared copy of a client or user name."""
+    if text is None:
+        return None
+    return _strings.setdefault(text, text)
+
+
+def timestamp():
+    """Returns the current time in epoch seconds."""
+    return int(time.time())
+
+
+def parse_date(value):
+    """Turns a "%Y-%m-%d %H:%M:%S" local time (or just the start of one, like
+    "2024-10" or "2024-10-01") into epoch seconds. Numbers are returned as ints
+    and an empty string as None."""
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    text = value.strip()
+    if not text:
+        return None
+    try:
+        return int(datetime.fromisoformat(text).timestamp())  # Much faster
+    except ValueError:
+        pass
+    default = "1970-01-01 00:00:00"
+    if len(text) < len(default) and len(text) >= 4:
+        text += default[len(text) :]
+    return int(time.mktime(time.strptime(text, DATE_FORMAT)))
+
+
+def format_date(epoch):
+    """Turns epoch seconds into a "%Y-%m-%d %H:%M:%S" local time string."""
+    if epoch is None:
+        return ""
+    return time.strftime(DATE_FORMAT, time.localtime(epoch))
+
+
+@dataclass(slots=True)
+class Proof:
+    """One proof. date_completed and completed_by stay None while it is pending,
+    and id is None until a store adds it."""
+
+    client: str
+    proof_type: str
+    created_by: str
+    date_created: int
+    date_completed: int | None = None
+    completed_by: str | None = None
+    id: int | None = None
+
+    def __post_init__(self):
+        self.client = intern(self.client)
+        self.proof_type = intern(self.proof_type)
+        self.created_by = intern(self.created_by)
+        self.completed_by = intern(self.completed_by)
+
+    @property
+    def is_completed(self):
+        return self.date_completed is not None
+
+    def completed(self, completed_by, date_completed):
+        """Returns a completed copy. Stored proofs are never changed in place."""
+        return replace(
+            self, completed_by=completed_by, date_completed=parse_date(date_completed)
+        )
+
+    def reassigned(self, created_by):
+        """Returns a copy that belongs to another user."""
+        return replace(self, created_by=created_by)
+
+    def with_id(self, proof_id):
+        """Returns a copy with the given id."""
+        return replace(self, id=proof_id)
+
+    def to_dict(self):
+        """Returns the proof as a dict for JSON, leaving out the empty fields."""
+        data = {
+            "id": self.id,
+            "client": self.client,
+            "proof_type": self.proof_type,
+            "created_by": self.created_by,
+            "date_created": self.date_created,
+        }
+        if self.id is None:
+            del data["id"]
+        if self.date_completed is not None:
+            data["date_completed"] = self.date_completed
+            data["completed_by"] = self.completed_by
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Builds a proof from to_dict() output. Dates written as strings by
+        older versions are converted to epoch seconds."""
+        return cls(
+            client=data["client"],
+            proof_type=data["proof_type"],
+            created_by=data["created_by"],
+            date_created=parse_date(data["date_created"]),
+            date_completed=parse_date(data.get("date_completed")),
+            completed_by=data.get("completed_by"),
+            id=data.get("id"),
+        )
@@ -0,0 +1,268 @@
+"""
+File: proof_report.py
+Purpose: Reports on proof throughput. The proofs are copied into a column table
+of NumPy arrays, with client, user and proof type names stored as small integer
+codes, so the reports are computed with array operations instead of a Python
+loop over every proof. NumPy is needed for this module only.
+
+Example:
+    table = ProofTable.from_store(store)
+    table.turnaround_percentiles(by="client")
+    table.counts_by("client")
+    table.throughput(by="completed_by")
+
+"""
+
+import itertools
+import time
+from functools import partial
+
+import numpy as np
+
+SECONDS_PER_DAY = 24 * 60 * 60
+PERCENTILES = (50, 90, 95)
+VALUE_BITS = 40  # Room for about 34,000 years of seconds
+
+
+class Categories:
+    """Gives each distinct name a small integer code."""
+
+    def __init__(self):
+        self.names = []
+        self.codes = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def code(self, name):
+        """Returns the code for a name, adding it if it is new."""
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+
+class ProofTable:
+    """Proofs stored as one array per column.
+
+    Dates are int64 epoch seconds, with -1 for the completion date of a pending
+    proof. client, created_by, completed_by and proof_type are int32 codes into
+    the clients, users and types categories (completed_by is -1 while pending).
+    """
+
+    def __init__(self, proofs=()):
+        proofs = list(proofs)
+        count = len(proofs)
+        self.clients = Categories()
+        self.users = Categories()
+        self.types = Categories()
+
+        def column(values, dtype):
+            return np.fromiter(values, dtype, count)
+
+        self.ids = column((proof.id for proof in proofs), np.int64)
+        self.date_created = column((proof.date_created for proof in proofs), np.int64)
+        self.date_completed = column(
+            (
+                -1 if proof.date_completed is None else proof.date_completed
+                for proof in proofs
+            ),
+            np.int64,
+        )
+        self.client = column(
+            (self.clients.code(proof.client) for proof in proofs), np.int32
+        )
+        self.created_by = column(
+            (self.users.code(proof.created_by) for proof in proofs), np.int32
+        )
+        self.completed_by = column(
+            (
+                -1 if proof.completed_by is None else self.users.code(proof.completed_by)
+                for proof in proofs
+            ),
+            np.int32,
+        )
+        self.proof_type = column(
+            (self.types.code(proof.proof_type) for proof in proofs), np.int32
+        )
+        self.completed = self.date_completed >= 0
+
+    @classmethod
+    def from_store(cls, store):
+        """Builds a table from the pending and completed proofs of a store."""
+        return cls(itertools.chain(store.pending, store.completed))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _codes(self, by):
+        """Returns the code column and its categories for a column name."""
+        if by == "client":
+            return self.client, self.clients
+        if by in ("created_by", "completed_by"):
+            return getattr(self, by), self.users
+        if by == "proof_type":
+            return self.proof_type, self.types
+        raise ValueError(f"Cannot group proofs by '{by}'.")
+
+    def _type_mask(self, mask, proof_type):
+        """Narrows a row mask to one proof type, if one is given."""
+        if proof_type is None:
+            return mask
+        code = self.types.codes.get(proof_type)
+        if code is None:
+            return np.zeros(len(self), bool)
+        return mask & (self.proof_type == code)
+
+    def counts_by(self, by="client", status="all"):
+        """Returns {name: number of proofs} for "pending", "completed" or "all"
+        proofs, largest first."""
+        codes, categories = self._codes(by)
+        if status == "completed":
+            codes = codes[self.completed]
+        elif status == "pending":
+            codes = codes[~self.completed]
+        counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+        order = np.argsort(-counts, kind="stable")
+        return {
+            categories.names[code]: int(counts[code])
+            for code in order
+            if counts[code]
+        }
+
+    def turnaround_percentiles(
+        self, by="client", proof_type="Approval", percentiles=PERCENTILES
+    ):
+        """Returns {name: {"count": n, "p50": seconds, ...}} with percentiles of
+        the time from creation to completion of completed proofs, per group."""
+        codes, categories = self._codes(by)
+        mask = self._type_mask(self.completed, proof_type)
+        turnaround = self.date_completed[mask] - self.date_created[mask]
+        groups, counts, values = grouped_percentiles(
+            codes[mask], turnaround, percentiles
+        )
+        report = {}
+        for group, count, row in zip(groups, counts, values):
+            stats = {"count": int(count)}
+            for percentile, value in zip(percentiles, row):
+                stats[f"p{percentile}"] = float(value)
+            report[categories.names[group]] = stats
+        return report
+
+    def throughput(self, by="completed_by", since=None):
+        """Returns {(name, "YYYY-MM-DD"): completed proofs} per group and local
+        day, optionally only for proofs completed at or after since (epoch
+        seconds)."""
+        codes, categories = self._codes(by)
+        mask = self.completed
+        if since is not None:
+            mask = mask & (self.date_completed >= since)
+        if not mask.any():
+            return {}
+        # Days end at local midnight. Each date gets the UTC offset in force at
+        # that time, looked up once per quarter hour as time zones move in
+        # steps of 15 minutes.
+        dates = self.date_completed[mask]
+        quarters, inverse = np.unique(dates // 900, return_inverse=True)
+        offsets = np.array(
+            [time.localtime(quarter * 900).tm_gmtoff for quarter in quarters.tolist()],
+            dtype=np.int64,
+        )
+        days = (dates + offsets[inverse.ravel()]) // SECONDS_PER_DAY
+        first_day = days.min()
+        span = int(days.max() - first_day) + 1
+        keys = codes[mask].astype(np.int64) * span + (days - first_day)
+        keys, counts = np.unique(keys, return_counts=True)
+        report = {}
+        for key, count in zip(keys.tolist(), counts.tolist()):
+            code, day = divmod(key, span)
+            date = time.strftime(
+                "%Y-%m-%d", time.gmtime((int(first_day) + day) * SECONDS_PER_DAY)
+            )
+            report[(categories.names[code], date)] = count
+        return report
+
+
+def grouped_percentiles(codes, values, percentiles=PERCENTILES):
+    """Percentiles of integer values within each group code, interpolated the
+    same way as np.percentile. Returns (group codes, counts, array of group x
+    percentile).
+
+    Sorting by (code, value) once puts every group in one sorted run, so each
+    percentile is read from its position in the run without a loop per group.
+    The code and value are packed into one int64 so a single plain sort does it.
+    """
+    if not len(values):
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(
+            (0, len(percentiles))
+        )
+    lowest = values.min()
+    packed = (codes.astype(np.int64) << VALUE_BITS) | (values - lowest)
+    packed.sort()
+    codes = packed >> VALUE_BITS
+    values = (packed & ((1 << VALUE_BITS) - 1)).astype(np.float64) + lowest
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+    groups = codes[starts]
+    fractions = np.asarray(percentiles, np.float64) / 100
+    positions = starts[:, None] + (counts[:, None] - 1) * fractions[None, :]
+    low = np.floor(positions).astype(np.int64)
+    high = np.minimum(low + 1, (starts + counts - 1)[:, None])
+    weight = positions - low
+    return groups, counts, values[low] * (1 - weight) + values[high] * weight
+
+
+def client_rows(table):
+    """Pending, completed and total proofs per client, busiest first."""
+    pending = table.counts_by("client", "pending")
+    completed = table.counts_by("client", "completed")
+    rows = [
+        (client, pending.get(client, 0), completed.get(client, 0), total)
+        for client, total in table.counts_by("client").items()
+    ]
+    return ("Client", "Pending", "Completed", "Total"), rows
+
+
+def turnaround_rows(table, by="client"):
+    """Approval turnaround percentiles per client or per user."""
+    report = table.turnaround_percentiles(by=by)
+    rows = [
+        (name, stats["count"])
+        + tuple(format_duration(stats[f"p{p}"]) for p in PERCENTILES)
+        for name, stats in sorted(report.items())
+    ]
+    title = "Client" if by == "client" else "User"
+    return (title, "Proofs") + tuple(f"p{p}" for p in PERCENTILES), rows
+
+
+def throughput_rows(table):
+    """Completed proofs per user per day, newest day first."""
+    report = table.throughput(by="completed_by")
+    rows = sorted(
+        ((user, day, count) for (user, day), count in report.items()),
+        key=lambda row: (row[1], row[0]),
+        reverse=True,
+    )
+    return ("User", "Day", "Completed"), rows
+
+
+# Report name: function returning (column titles, rows) for a ProofTable
+REPORTS = {
+    "Proofs per client": client_rows,
+    "Approval turnaround by client": partial(turnaround_rows, by="client"),
+    "Approval turnaround by user": partial(turnaround_rows, by="completed_by"),
+    "Completed per user per day": throughput_rows,
+}
+
+
+def format_duration(seconds):
+    """Formats a number of seconds as days, hours and minutes."""
+    minutes = int(seconds) // 60
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    if days:
+        return f"{days}d {hours}h {minutes}m"
+    if hours:
+        return f"{hours}h {minutes}m"
+    return f"{minutes}m"
@@ -0,0 +1,358 @@
+"""
+File: proof_server.py
+Purpose: Small asyncio HTTP service so several workstations can share one proof
+store. Every write goes through a single writer task that applies the queued
+requests in a batch and commits them with one flush, so concurrent users never
+overwrite each other.
+
+Start it with "python proof_server.py" and point the GUI at it with
+"python proof_wizard.py --server http://127.0.0.1:8765".
+
+Endpoints (JSON in and out, dates in epoch seconds):
+    GET  /proofs?status=pending&offset=0&limit=100&sort=client,-date_created
+    GET  /proofs/<id>?status=pending
+    POST /proofs             {"client", "proof_type", "user"} or {"proofs": [...]}
+    POST /proofs/complete    {"ids": [...], "user", "date_completed"}
+    POST /proofs/cancel      {"ids": [...]}
+    POST /proofs/reassign    {"ids": [...], "user"}
+    GET  /counters?client=Client A&user=name&day=2024-10-13
+    GET  /clients?q=text&limit=50
+    POST /clients            {"name"} or {"names": [...]}
+    POST /clients/remove     {"name"} or {"names": [...]}
+
+"""
+
+import argparse
+import asyncio
+import json
+from urllib.parse import parse_qs, urlsplit
+
+from client_manager import ClientManager
+from io_worker import IOWorker
+from proof_engine import ProofEngine, open_store
+from proof_record import Proof
+
+HOST = "127.0.0.1"
+PORT = 8765
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Server Error"}
+
+
+class NotFound(Exception):
+    """Raised for an unknown path or proof."""
+
+
+def text_field(data, name, required=False):
+    """Returns a string field of a request body, or None if it is left out."""
+    value = data.get(name)
+    if value is None and not required:
+        return None
+    if not isinstance(value, str):
+        raise ValueError(f"{name} must be a string.")
+    return value
+
+
+def date_field(data, name):
+    """Returns a date field of a request body, epoch seconds or a string."""
+    value = data.get(name)
+    if value is not None and (
+        isinstance(value, bool) or not isinstance(value, (int, float, str))
+    ):
+        raise ValueError(f"{name} must be epoch seconds or a date string.")
+    return value
+
+
+def list_field(data, name, kind):
+    """Returns a list field of a request body whose items are all of one type."""
+    values = data.get(name)
+    if not isinstance(values, list) or not all(
+        isinstance(value, kind) and not isinstance(value, bool) for value in values
+    ):
+        raise ValueError(f"{name} must be a list of {kind.__name__} values.")
+    return values
+
+
+def number_param(query, name, default):
+    """Returns a whole number from the query string that is not negative."""
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise ValueError(f"{name} must be a whole number.") from None
+    if value < 0:
+        raise ValueError(f"{name} must not be negative.")
+    return value
+
+
+class ProofServer:
+    """Serves the proof store and client list over HTTP.
+
+    Reads are answered straight from the store. Writes are put on a queue and
+    applied by one writer task, which flushes the store once per batch before
+    answering the requests in it.
+    """
+
+    def __init__(self, store, client_manager, io_worker=None, max_batch=500):
+        self.store = store
+        self.client_manager = client_manager
+        self.io_worker = io_worker
+        self.max_batch = max_batch
+        self.writes = None
+        self.requests = 0
+
+    async def serve(self, host=HOST, port=PORT):
+        """Runs the server until it is cancelled."""
+        self.writes = asyncio.Queue()
+        writer_task = asyncio.create_task(self.write_loop())
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        print(f"Proof server listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+    async def submit(self, operation):
+        """Queues a write and waits until it has been applied and flushed."""
+        future = asyncio.get_running_loop().create_future()
+        await self.writes.put((operation, future))
+        return await future
+
+    async def write_loop(self):
+        """The single owner of all writes. Applies queued operations in batches
+        and flushes the store once for each batch."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.writes.get()]
+            while not self.writes.empty() and len(batch) < self.max_batch:
+                batch.append(self.writes.get_nowait())
+
+            results = []
+            for operation, future in batch:
+                try:
+                    results.append((future, operation(), None))
+                except Exception as error:
+                    results.append((future, None, error))
+            try:
+                if self.store.thread_safe:
+                    await loop.run_in_executor(None, self.store.flush)
+                else:
+                    self.store.flush()  # SQLite: reads use the same connection
+            except Exception as error:
+                results = [(future, None, error) for future, _, _ in results]
+
+            if self.io_worker is not None:
+                for error in self.io_worker.poll():
+                    print(f"Save error: {error}")
+
+            for future, result, error in results:
+                if future.cancelled():
+                    continue
+                if error is None:
+                    future.set_result(result)
+                else:
+                    future.set_exception(error)
+
+    async def handle_connection(self, reader, writer):
+        """Reads HTTP/1.1 requests from one connection, keeping it open. A
+        request that cannot be parsed gets a 400 answer and the connection is
+        closed."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                try:
+                    method, target, version = request_line.decode().split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, value = line.decode().split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                    length = int(headers.get("content-length", 0))
+                    body = await reader.readexactly(length)
+                except ValueError as error:
+                    self.respond(writer, 400, {"error": f"Bad request: {error}"})
+                    await writer.drain()
+                    break
+
+                status, payload = await self.dispatch(method, target, body)
+                self.requests += 1
+                self.respond(writer, status, payload)
+                await writer.drain()
+                if version == "HTTP/1.0" or headers.get("connection") == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def respond(self, writer, status, payload):
+        """Writes one JSON response."""
+        data = json.dumps(payload, default=Proof.to_dict).encode()
+        writer.write(
+            f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode()
+            + data
+        )
+
+    async def dispatch(self, method, target, body):
+        """Routes one request and turns errors into status codes."""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            data = json.loads(body) if body else {}
+            if not isinstance(data, dict):
+                raise ValueError("The request body must be a JSON object.")
+            return 200, await self.route(method, parts, query, data)
+        except NotFound as error:
+            return 404, {"error": str(error)}
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {"error": str(error)}
+        except Exception as error:
+            return 500, {"error": str(error)}
+
+    async def route(self, method, parts, query, data):
+        """Handles one request and returns the JSON payload."""
+        if parts[:1] == ["proofs"]:
+            if method == "GET" and len(parts) == 1:
+                return self.list_proofs(query)
+            if method == "GET" and len(parts) == 2:
+                table = self.table(query.get("status", "pending"))
+                proof = table.get(int(parts[1]))
+                if proof is None:
+                    raise NotFound(f"Proof {parts[1]} not found.")
+                return proof
+            if method == "POST" and len(parts) == 1:
+                rows = self.proof_rows(data)
+                user = text_field(data, "user")
+                return await self.submit(lambda: self.create_proofs(rows, user))
+            if method == "POST" and parts[1:] == ["complete"]:
+                engine = ProofEngine(self.store, text_field(data, "user"))
+                ids = list_field(data, "ids", int)
+                date_completed = date_field(data, "date_completed")
+                return {
+                    "ids": await self.submit(
+                        lambda: engine.complete_proofs(ids, date_completed)
+                    )
+                }
+            if method == "POST" and parts[1:] == ["cancel"]:
+                engine = ProofEngine(self.store, text_field(data, "user"))
+                ids = list_field(data, "ids", int)
+                return {"ids": await self.submit(lambda: engine.cancel_proofs(ids))}
+            if method == "POST" and parts[1:] == ["reassign"]:
+                engine = ProofEngine(self.store)
+                ids = list_field(data, "ids", int)
+                user = text_field(data, "user")
+                return {
+                    "ids": await self.submit(lambda: engine.reassign_proofs(ids, user))
+                }
+        if method == "GET" and parts == ["counters"]:
+            return self.store.counters.summary(
+                query.get("client"), query.get("user"), query.get("day")
+            )
+        if parts[:1] == ["clients"]:
+            if method == "GET" and len(parts) == 1:
+                if "q" in query:
+                    limit = number_param(query, "limit", 50)
+                    return self.client_manager.search_clients(query["q"], limit)
+                return self.client_manager.get_clients()
+            if method == "POST" and len(parts) == 1 and "names" in data:
+                names = list_field(data, "names", str)
+                return {
+                    "added": await self.submit(
+                        lambda: self.client_manager.add_clients(names)
+                    )
+                }
+            if method == "POST" and len(parts) == 1:
+                name = text_field(data, "name", required=True).strip()
+                return {
+                    "message": await self.submit(
+                        lambda: self.client_manager.add_client(name)
+                    )
+                }
+            if method == "POST" and parts[1:] == ["remove"] and "names" in data:
+                names = list_field(data, "names", str)
+                return {
+                    "removed": await self.submit(
+                        lambda: self.client_manager.remove_clients(names)
+                    )
+                }
+            if method == "POST" and parts[1:] == ["remove"]:
+                name = text_field(data, "name", required=True)
+                return {
+                    "message": await self.submit(
+                        lambda: self.client_manager.remove_client(name)
+                    )
+                }
+        raise NotFound(f"No endpoint for {method} /{'/'.join(parts)}.")
+
+    def table(self, status):
+        """Returns the pending or completed proofs of the store."""
+        if status == "pending":
+            return self.store.pending
+        if status == "completed":
+            return self.store.completed
+        raise ValueError("status must be pending or completed.")
+
+    def list_proofs(self, query):
+        """Returns one page of proofs in the requested order."""
+        table = self.table(query.get("status", "pending"))
+        # A leading "-" on a sort column means descending
+        sort_keys = [
+            (column.lstrip("-"), column.startswith("-"))
+            for column in query.get("sort", "").split(",")
+            if column
+        ]
+        view = table.view(sort_keys)
+        offset = number_param(query, "offset", 0)
+        limit = number_param(query, "limit", 100)
+        return {"total": len(view), "proofs": view[offset : offset + limit]}
+
+    def proof_rows(self, data):
+        """Returns the proofs to create from a request body, one proof or every
+        proof in data["proofs"], after checking their field types."""
+        rows = data["proofs"] if "proofs" in data else [data]
+        if not isinstance(rows, list):
+            raise ValueError("proofs must be a list.")
+        for row in rows:
+            if not isinstance(row, dict):
+                raise ValueError("Each proof must be a JSON object.")
+            for name in ("client", "proof_type", "created_by"):
+                text_field(row, name)
+            date_field(row, "date_created")
+        return rows
+
+    def create_proofs(self, rows, user):
+        """Creates the proofs checked by proof_rows()."""
+        return ProofEngine(self.store, user).create_proofs(rows)
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Proof Wizard server.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--db", help="use a SQLite database instead of the journal")
+    args = parser.parse_args()
+
+    io_worker = IOWorker()
+    store = open_store(args.db).load()
+    if store.thread_safe:
+        store.writer = io_worker.submit
+    client_manager = ClientManager(db_file=args.db)
+    client_manager.writer = io_worker.submit
+    try:
+        server = ProofServer(store, client_manager, io_worker)
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        io_worker.stop()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,818 @@
+"""
+File: proof_store.py
+Purpose: Append-only storage for pending and completed proofs. Every change is
+written as one small event to a journal file instead of rewriting the full JSON
+lists. The journal is compacted into a snapshot file every so often.
+
+"""
+
+import collections
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from file_lock import FileLock
+from proof_counters import ProofCounters
+from proof_index import ProofList
+from proof_jsonl import read_proofs
+from proof_record import Proof
+
+SNAPSHOT_FILE = "proofs.snapshot"
+JOURNAL_FILE = "proofs.journal"
+LEGACY_PENDING_FILE = "pending.json"
+LEGACY_COMPLETED_FILE = "completed.json"
+PENDING_COLUMNS = ("date_created", "created_by", "client")
+COMPLETED_COLUMNS = PENDING_COLUMNS + ("date_completed", "completed_by")
+ID_BLOCK = 100  # Proof ids a store with a writer reserves at a time
+
+
+def fsync_directory(path):
+    """Flush a directory entry so a rename survives a crash (no-op on Windows)."""
+    if os.name != "posix":
+        return
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_write_lines(filename, lines):
+    """Write lines to a temp file, fsync it and rename it over the target."""
+    tmp_name = filename + ".tmp"
+    with open(tmp_name, "w", encoding="utf-8") as file:
+        for line in lines:
+            file.write(line)
+            file.write("\n")
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_name, filename)
+    fsync_directory(os.path.dirname(filename))
+
+
+def _next_id_after(event):
+    """Returns the proof id a journal event uses up to, or 0."""
+    if event["op"] == "created":
+        proof = event["proof"]
+        return (proof.id if isinstance(proof, Proof) else proof["id"]) + 1
+    return event.get("next_id", 0)
+
+
+def _event_ids(event):
+    """Returns the set of proof ids a change to existing proofs names."""
+    if "ids" in event:
+        return set(event["ids"])
+    return {event["id"]} if "id" in event else set()
+
+
+class ProofStore:
+    """Keeps the pending and completed proof lists backed by a journal and snapshot.
+
+    The snapshot is a JSON Lines file. The first line is a header holding the
+    last journal sequence number folded into it and the next proof id. Every
+    other line is one proof, pending proofs first. The journal holds one event
+    per line ("created", "completed", "cancelled", "reassigned", "archived" or
+    "reserved") and is replayed on top of the snapshot when loading. Proofs are
+    held as Proof records and written with Proof.to_dict(), so dates are epoch
+    seconds in both files.
+
+    counters holds the proof counts per client, user and day. Every applied
+    event updates them and the snapshot header saves them, so they are right
+    as soon as the pending proofs are loaded. A snapshot from before the
+    counters is counted while it loads.
+
+    Loading can be split in two so the program can start before the history is
+    read: load_pending() reads the pending proofs and the journal, then the
+    completed proofs are read in pages with read_completed_pages(), handed to
+    add_completed_page() and finished with finish_loading(). Until then newly
+    completed proofs are held back so the history keeps its order, and the
+    snapshot is not compacted.
+
+    Several processes can share the files. Every change takes a file lock,
+    first applies the events other processes appended since this store last
+    looked, then picks the next sequence number and proof id and appends its
+    own events before letting go of the lock. If another process compacted
+    events this store had not seen into a new snapshot, everything is loaded
+    again. refresh() catches up without making a change.
+
+    Records in the lists are never changed in place, so a compaction can write
+    copies of the lists from another thread. Set writer to a function taking
+    (key, job), such as IOWorker.submit, to run the file lock and all disk work
+    off the calling thread. Without a writer they run right away.
+
+    With a writer a change is made in memory straight away and its events are
+    appended by a job on the writer, which takes the lock, reads what other
+    processes appended and queues it for the calling thread. Those events are
+    applied at the start of the next change or refresh(). New proofs take their
+    ids from blocks the writer reserves ahead with a "reserved" event. If
+    another process changed a proof while a change to it was on its way to the
+    journal, the journal order wins and the store is loaded again.
+    """
+
+    # flush() may run on another thread while the lists are read
+    thread_safe = True
+
+    def __init__(
+        self,
+        snapshot_file=SNAPSHOT_FILE,
+        journal_file=JOURNAL_FILE,
+        pending_file=LEGACY_PENDING_FILE,
+        completed_file=LEGACY_COMPLETED_FILE,
+        batch_size=50,
+        batch_interval=2.0,
+        compact_threshold=1000,
+    ):
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.pending_file = pending_file
+        self.completed_file = completed_file
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.compact_threshold = compact_threshold
+
+        self.pending = ProofList(columns=PENDING_COLUMNS)
+        self.completed = ProofList(columns=COMPLETED_COLUMNS)
+        self.next_id = 1
+        self.seq = 0
+        self.journal_events = 0
+        self.counters = ProofCounters()
+
+        self.loaded = False
+        self._count_history = False
+        self._completed_offset = None
+        self._completed_tail = []
+        self._archived_while_loading = set()
+
+        self.writer = None
+        self.file_lock = FileLock(journal_file)
+        self._journal = None
+        self._journal_reader = None
+        self._journal_size = 0
+        self._snapshot = None
+        self._buffer = []
+        self._buffer_lock = threading.Lock()
+        self._io_lock = threading.RLock()
+        self._unsynced = 0
+        self._fsync_due = False
+        self._compacting = False
+        self._last_sync = time.monotonic()
+        # Where the journal is up to, kept by whoever holds the file lock
+        self._disk_seq = 0
+        self._disk_next_id = 1
+        # Handed between the writer and the thread making changes
+        self._free_ids = collections.deque()
+        self._incoming = []
+        self._in_flight = []
+
+    def load(self):
+        """Loads the snapshot and replays the journal, importing old JSON on first run."""
+        self.load_pending()
+        for page in self.read_completed_pages():
+            self.add_completed_page(page)
+        self.finish_loading()
+        return self
+
+    def load_pending(self):
+        """Loads the pending proofs and replays the journal. Completed proofs from
+        the snapshot are left for read_completed_pages()."""
+        with self.file_lock:
+            if not os.path.exists(self.snapshot_file) and not os.path.exists(
+                self.journal_file
+            ):
+                self.loaded = True
+                self.import_legacy()
+            else:
+                snapshot_seq = self._load_snapshot_pending()
+                self.seq = snapshot_seq
+                good_size = self._replay_journal(snapshot_seq)
+
+                # Drop a half-written last line left behind by a crash
+                if good_size is not None and good_size < os.path.getsize(
+                    self.journal_file
+                ):
+                    with open(self.journal_file, "r+b") as file:
+                        file.truncate(good_size)
+            self._disk_seq = self.seq
+            self._disk_next_id = self.next_id
+        return self
+
+    def read_completed_pages(self, page_size=5000):
+        """Yields the completed proofs from the snapshot in lists of page_size.
+
+        This only reads the file, so it can run on a background thread.
+        """
+        file, self._snapshot = self._snapshot, None
+        if file is None or self._completed_offset is None:
+            return
+        page = []
+        with file:
+            file.seek(self._completed_offset)
+            for line in file:
+                page.append(Proof.from_dict(json.loads(line)))
+                if len(page) >= page_size:
+                    yield page
+                    page = []
+        if page:
+            yield page
+
+    def add_completed_page(self, page):
+        """Adds a page of completed proofs read by read_completed_pages()."""
+        if self.loaded:
+            return  # Everything was loaded again while the pages were read
+        archived = self._archived_while_loading
+        for proof in page:
+            if self._count_history:
+                self.counters.added(proof)
+            if proof.id not in archived:
+                self.completed.append(proof)
+
+    def finish_loading(self):
+        """Adds the proofs completed since the snapshot once the history is in."""
+        if self.loaded:
+            return
+        for proof in self._completed_tail:
+            self.completed.append(proof)
+        self._completed_tail = []
+        self._completed_offset = None
+        self._archived_while_loading = set()
+        self._count_history = False
+        self.loaded = True
+
+    def import_legacy(self):
+        """Imports the old pending.json and completed.json lists into a new snapshot.
+        They are read one record at a time and may also be JSON Lines files."""
+        for filename, target in (
+            (self.pending_file, self.pending),
+            (self.completed_file, self.completed),
+        ):
+            if not os.path.exists(filename):
+                continue
+            for proof in read_proofs(filename):
+                target.append(proof.with_id(self.next_id))
+                self.counters.added(proof)
+                self.next_id += 1
+        self.compact()
+
+    def _load_snapshot_pending(self):
+        """Reads the snapshot header and pending proofs, remembering where the
+        completed proofs start. Returns the journal sequence it covers.
+
+        The file is kept open for read_completed_pages(), so the pages come from
+        this snapshot even if another process replaces it in the meantime.
+        """
+        try:
+            file = open(self.snapshot_file, "rb")
+        except FileNotFoundError:
+            return 0
+        header = json.loads(file.readline() or b"{}")
+        self.next_id = header.get("next_id", 1)
+        self._count_history = "counters" not in header
+        self.counters = ProofCounters(header.get("counters"))
+        while True:
+            offset = file.tell()
+            line = file.readline()
+            if not line:
+                break
+            record = json.loads(line)
+            if "date_completed" in record:
+                self._completed_offset = offset
+                break
+            proof = Proof.from_dict(record)
+            if self._count_history:
+                self.counters.added(proof)
+            self.pending.append(proof)
+        if self._completed_offset is None:
+            file.close()
+        else:
+            self._snapshot = file
+        return header.get("seq", 0)
+
+    def _snapshot_header(self):
+        """Returns the header of the snapshot on disk."""
+        try:
+            with open(self.snapshot_file, "rb") as file:
+                return json.loads(file.readline() or b"{}")
+        except FileNotFoundError:
+            return {}
+
+    def _snapshot_seq(self):
+        """Returns the journal sequence covered by the snapshot on disk."""
+        return self._snapshot_header().get("seq", 0)
+
+    def _replay_journal(self, snapshot_seq):
+        """Applies journal events newer than the snapshot. Returns the good byte size."""
+        try:
+            file = open(self.journal_file, "rb")
+        except FileNotFoundError:
+            return None
+        good_size = 0
+        for raw in file:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                event = json.loads(raw)
+            except ValueError:
+                break
+            good_size += len(raw)
+            self.journal_events += 1
+            if event["seq"] <= snapshot_seq:
+                continue
+            self._apply(event)
+            self.seq = event["seq"]
+        # Kept open so _catch_up() can tell when the file is replaced
+        self._journal_reader = file
+        self._journal_size = good_size
+        return good_size
+
+    def _catch_up(self):
+        """Reads the events other processes appended to the journal since this
+        store last read or wrote it. Needs the file lock.
+
+        The journal is compared with the file this store has open instead of by
+        name, because a compaction renames a new file over it. Holding the old
+        file open also stops its inode number from being reused for the new one.
+        """
+        try:
+            stat = os.stat(self.journal_file)
+        except FileNotFoundError:
+            return
+        reader = self._journal_reader
+        if reader is None or os.fstat(reader.fileno()).st_ino != stat.st_ino:
+            # The journal was replaced by a compaction, here or in another process
+            self._close_journal()
+            header = self._snapshot_header()
+            if header.get("seq", 0) > self._disk_seq:
+                if self.writer is None:
+                    self._reload()
+                    return
+                # The lists belong to the thread making changes, which loads
+                # them again. Carry on from the snapshot to append our events.
+                self._receive(None, False)
+                self._disk_seq = header["seq"]
+                self._disk_next_id = max(self._disk_next_id, header["next_id"])
+            reader = self._journal_reader = open(self.journal_file, "rb")
+            self._journal_size = 0
+            self.journal_events = 0
+        if stat.st_size <= self._journal_size:
+            return
+        reader.seek(self._journal_size)
+        for raw in reader:
+            if not raw.endswith(b"\n"):
+                break  # Still being written
+            self._journal_size += len(raw)
+            try:
+                event = json.loads(raw)
+            except ValueError:
+                continue  # Torn by a process that crashed while writing
+            self.journal_events += 1
+            if event["seq"] > self._disk_seq:
+                self._disk_seq = event["seq"]
+                self._disk_next_id = max(self._disk_next_id, _next_id_after(event))
+                self._receive(event, False)
+
+    def _receive(self, event, own):
+        """Takes an event read from or written to the journal, or None when the
+        store has to be loaded again. Without a writer it is applied right away,
+        with one it is queued for the thread making changes."""
+        if self.writer is not None:
+            with self._buffer_lock:
+                self._incoming.append((event, own))
+            return
+        if not own:
+            self._apply(event)
+        self.seq = event["seq"]
+
+    def _apply_incoming(self):
+        """Applies the events the writer queued, in journal order. Returns True if
+        other processes changed anything.
+
+        Our own events were applied when they were logged. An event from another
+        process that touches a proof one of ours is still on its way to the
+        journal with came first in the journal, so the store is loaded again to
+        end up with the journal order.
+        """
+        with self._buffer_lock:
+            incoming, self._incoming = self._incoming, []
+        changed = reload = False
+        for event, own in incoming:
+            if event is None:
+                reload = True
+            elif own:
+                self._in_flight.pop(0)
+                self.seq = event["seq"]
+            elif not reload:
+                ids = _event_ids(event)
+                reload = any(ids & _event_ids(mine) for mine in self._in_flight)
+                if not reload:
+                    self._apply(event)
+                    self.seq = event["seq"]
+                changed = True
+        if reload:
+            self._reload()
+        self._maybe_compact()
+        return changed
+
+    def _close_journal(self):
+        """Closes the journal files this store has open."""
+        with self._io_lock:
+            for file in (self._journal, self._journal_reader):
+                if file is not None:
+                    file.close()
+            self._journal = None
+            self._journal_reader = None
+
+    def _reload(self):
+        """Loads everything again after another process folded events this store
+        had not seen into a new snapshot. Events logged here that are not in
+        the journal yet are applied again on top."""
+        with self.file_lock:
+            if self._snapshot is not None:
+                self._snapshot.close()
+                self._snapshot = None
+            self._close_journal()
+            self.pending.clear()
+            self.completed.clear()
+            self.next_id = 1
+            self.journal_events = 0
+            self.counters = ProofCounters()
+            self.loaded = False
+            self._count_history = False
+            self._completed_offset = None
+            self._completed_tail = []
+            self._archived_while_loading = set()
+            self.load()
+            with self._buffer_lock:
+                self._incoming = []
+                self._in_flight = list(self._buffer)
+            for event in self._in_flight:
+                self._apply(event)
+
+    @contextmanager
+    def _shared(self):
+        """Wraps a change. Without a writer the journal lock is held, events from
+        other processes are applied first and the events logged in the block
+        are appended at the end of it. With a writer the events the writer read
+        are applied first and a job to append the new ones is handed to it."""
+        if self.writer is not None:
+            self._apply_incoming()
+            try:
+                yield
+            finally:
+                self.writer(self.journal_file, self._write_behind)
+            return
+        with self.file_lock:
+            self._catch_up()
+            try:
+                yield
+            finally:
+                self._append_buffer()
+        self._write_journal()
+        self._maybe_compact()
+
+    def _sync(self, reserve=False):
+        """Catches up with the journal, appends the logged events and fsyncs them
+        when a batch is due. With reserve set it also tops up the proof ids
+        reserved for this store."""
+        with self.file_lock:
+            self._catch_up()
+            self._append_buffer()
+            if reserve and len(self._free_ids) < ID_BLOCK // 2:
+                self._reserve_ids(ID_BLOCK)
+        self._write_journal()
+
+    def _write_behind(self):
+        """The job handed to the writer after a change or refresh()."""
+        self._sync(reserve=True)
+
+    def refresh(self):
+        """Applies changes other processes made. Returns True if there were any."""
+        if self.writer is not None:
+            changed = self._apply_incoming()
+            self.writer(self.journal_file, self._write_behind)
+            return changed
+        seq = self.seq
+        with self._shared():
+            pass
+        return self.seq != seq
+
+    def _apply(self, event):
+        """Applies one journal event to the in-memory lists."""
+        op = event["op"]
+        if op == "created":
+            proof = event["proof"]
+            if not isinstance(proof, Proof):
+                proof = Proof.from_dict(proof)  # Read back from the journal
+            self.next_id = max(self.next_id, proof.id + 1)
+            self.counters.added(proof)
+            if proof.is_completed:
+                self._add_completed(proof)
+            else:
+                self.pending.append(proof)
+        elif op == "completed":
+            for proof in self._take_pending(event):
+                proof = proof.completed(event["completed_by"], event["date_completed"])
+                self.counters.completed(proof)
+                self._add_completed(proof)
+        elif op == "cancelled":
+            for proof in self._take_pending(event):
+                self.counters.cancelled(proof)
+        elif op == "reassigned":
+            created_by = event["created_by"]
+            proofs = [
+                self.pending.get(proof_id)
+                for proof_id in event["ids"]
+                if proof_id in self.pending
+            ]
+            for proof in proofs:
+                self.counters.reassigned(proof, created_by)
+            self.pending.replace_many(proof.reassigned(created_by) for proof in proofs)
+        elif op == "archived":
+            if self.loaded:
+                self.completed.pop_many(event["ids"])
+            else:
+                # The proofs may still be waiting in the unread history pages
+                ids = set(event["ids"])
+                self._archived_while_loading.update(ids)
+                self._completed_tail = [
+                    proof for proof in self._completed_tail if proof.id not in ids
+                ]
+        elif op == "reserved":
+            self.next_id = max(self.next_id, event["next_id"])
+
+    def _add_completed(self, proof):
+        """Adds a completed proof, holding it back while the history loads."""
+        if self.loaded:
+            self.completed.append(proof)
+        else:
+            self._completed_tail.append(proof)
+
+    def _take_pending(self, event):
+        """Removes and returns the pending proofs named by an event."""
+        if "ids" in event:
+            return self.pending.pop_many(event["ids"])
+        proof = self.pending.pop(event["id"])
+        return [] if proof is None else [proof]
+
+    def _log(self, event):
+        """Applies an event and queues it for the journal. Called inside
+        _shared(). The event gets its sequence number when it is appended."""
+        self._apply(event)
+        if self.writer is not None:
+            self._in_flight.append(event)
+        with self._buffer_lock:
+            self._buffer.append(event)
+
+    def _maybe_compact(self):
+        """Asks for a compaction once the journal is long enough and everything
+        in memory is in the journal."""
+        if (
+            self.loaded
+            and not self._compacting
+            and not self._in_flight
+            and self.journal_events >= self.compact_limit()
+        ):
+            self.request_compaction()
+
+    def _schedule(self, key, job):
+        """Runs a disk job now, or hands it to the writer when one is set."""
+        if self.writer is None:
+            job()
+        else:
+            self.writer(key, job)
+
+    def compact_limit(self):
+        """Number of journal events that triggers a compaction. It grows with the
+        store so the cost of rewriting the snapshot stays spread out."""
+        records = len(self.pending) + len(self.completed)
+        return max(self.compact_threshold, records // 4)
+
+    def add_proof(self, proof):
+        """Adds a new proof and gives it an id. Proofs with a completion date go
+        straight to the completed list."""
+        return self.add_proofs([proof])[0]
+
+    def add_proofs(self, proofs):
+        """Adds several new proofs under one lock. Returns them with their ids."""
+        proofs = list(proofs)
+        added = []
+        with self._shared():
+            for proof, proof_id in zip(proofs, self._new_ids(len(proofs))):
+                proof = proof.with_id(proof_id)
+                self._log({"op": "created", "proof": proof})
+                added.append(proof)
+        return added
+
+    def _new_ids(self, count):
+        """Returns the ids for count new proofs. Without a writer they follow
+        next_id, as the file lock is held. With one they come from the blocks
+        the writer reserves ahead, and the lock is only taken here when an
+        import uses them up."""
+        if self.writer is None:
+            return range(self.next_id, self.next_id + count)
+        if len(self._free_ids) < count:
+            with self.file_lock:
+                self._catch_up()
+                self._reserve_ids(max(count, ID_BLOCK))
+        return [self._free_ids.popleft() for _ in range(count)]
+
+    def _reserve_ids(self, count):
+        """Sets the next count proof ids aside for this store with a "reserved"
+        event, so other processes skip them. Needs the file lock."""
+        start = self._disk_next_id
+        self._write_events([{"op": "reserved", "next_id": start + count}], False)
+        self._free_ids.extend(range(start, start + count))
+
+    def complete_proofs(self, proof_ids, completed_by, date_completed):
+        """Moves pending proofs to the completed list as one journal event."""
+        with self._shared():
+            proof_ids = [
+                proof_id for proof_id in proof_ids if proof_id in self.pending
+            ]
+            if proof_ids:
+                self._log(
+                    {
+                        "op": "completed",
+                        "ids": proof_ids,
+                        "completed_by": completed_by,
+                        "date_completed": date_completed,
+                    }
+                )
+        return proof_ids
+
+    def cancel_proofs(self, proof_ids):
+        """Removes pending proofs without completing them."""
+        with self._shared():
+            proof_ids = [
+                proof_id for proof_id in proof_ids if proof_id in self.pending
+            ]
+            if proof_ids:
+                self._log({"op": "cancelled", "ids": proof_ids})
+        return proof_ids
+
+    def reassign_proofs(self, proof_ids, created_by):
+        """Gives pending proofs to another user as one journal event."""
+        with self._shared():
+            proof_ids = [
+                proof_id for proof_id in proof_ids if proof_id in self.pending
+            ]
+            if proof_ids:
+                self._log(
+                    {"op": "reassigned", "ids": proof_ids, "created_by": created_by}
+                )
+        return proof_ids
+
+    def archive_candidates(self, cutoff):
+        """Returns the completed proofs completed before the cutoff date."""
+        if not self.loaded:
+            raise RuntimeError("The proof history has not finished loading.")
+        return self.completed.below("date_completed", cutoff)
+
+    def archive_proofs(self, proof_ids):
+        """Removes completed proofs that have been written to the archive."""
+        with self._shared():
+            proof_ids = [
+                proof_id for proof_id in proof_ids if proof_id in self.completed
+            ]
+            if proof_ids:
+                self._log({"op": "archived", "ids": proof_ids})
+        return proof_ids
+
+    def request_flush(self):
+        """Asks for the logged events to be appended and fsynced."""
+        self._fsync_due = True
+        self._schedule(self.journal_file, self._sync)
+
+    def flush(self):
+        """Appends and fsyncs the logged events right away."""
+        self._fsync_due = True
+        self._sync()
+
+    def _append_buffer(self):
+        """Appends the buffered events to the journal. Needs the file lock and
+        a _catch_up() since it was taken."""
+        with self._buffer_lock:
+            events, self._buffer = self._buffer, []
+        self._write_events(events, True)
+
+    def _write_events(self, events, own):
+        """Numbers events after the last one in the journal and appends them.
+        Needs the file lock and a _catch_up() since it was taken."""
+        if not events:
+            return
+        lines = []
+        for event in events:
+            self._disk_seq += 1
+            event["seq"] = self._disk_seq
+            self._disk_next_id = max(self._disk_next_id, _next_id_after(event))
+            lines.append(
+                json.dumps(event, separators=(",", ":"), default=Proof.to_dict)
+            )
+        data = ("\n".join(lines) + "\n").encode()
+        with self._io_lock:
+            if self._journal is None:
+                self._journal = open(self.journal_file, "ab")
+                if self._journal_reader is None:
+                    # The journal did not exist when this store caught up.
+                    # Other processes wait for the file lock, so all of it
+                    # has been read.
+                    reader = self._journal_reader = open(self.journal_file, "rb")
+                    self._journal_size = os.fstat(reader.fileno()).st_size
+            self._journal.write(data)
+            self._journal.flush()
+        self._journal_size += len(data)
+        self.journal_events += len(events)
+        self._unsynced += len(events)
+        if (
+            self._unsynced >= self.batch_size
+            or time.monotonic() - self._last_sync >= self.batch_interval
+        ):
+            self._fsync_due = True
+        for event in events:
+            self._receive(event, own)
+
+    def _write_journal(self):
+        """Fsyncs the journal when a batch is due."""
+        with self._io_lock:
+            if self._fsync_due:
+                self._fsync_due = False
+                if self._journal is not None and self._unsynced:
+                    os.fsync(self._journal.fileno())
+                self._unsynced = 0
+                self._last_sync = time.monotonic()
+
+    def request_compaction(self):
+        """Copies the lists and asks for them to be written as a new snapshot."""
+        if not self.loaded:
+            raise RuntimeError("The proof history has not finished loading.")
+        self._compacting = True
+        state = (
+            self.seq,
+            self.next_id,
+            self.counters.copy(),
+            list(self.pending),
+            list(self.completed),
+        )
+        self._schedule(self.snapshot_file, lambda: self._write_snapshot(*state))
+
+    def compact(self):
+        """Folds the journal into a new snapshot right away."""
+        if not self.loaded:
+            raise RuntimeError("The proof history has not finished loading.")
+        self._write_snapshot(
+            self.seq,
+            self.next_id,
+            self.counters.copy(),
+            list(self.pending),
+            list(self.completed),
+        )
+
+    def _write_snapshot(self, seq, next_id, counters, pending, completed):
+        """Writes a snapshot of the lists and counters as they were at journal
+        event seq, then drops the journal events it covers.
+
+        The proofs are turned into JSON before the locks are taken, so other
+        threads and processes only wait for the write, rename and journal trim.
+        """
+        if self._snapshot_seq() > seq:
+            self._compacting = False
+            return
+        header = {"seq": seq, "next_id": next_id, "counters": counters.to_dict()}
+        lines = [json.dumps(header)]
+        lines.extend(
+            json.dumps(proof.to_dict(), separators=(",", ":")) for proof in pending
+        )
+        lines.extend(
+            json.dumps(proof.to_dict(), separators=(",", ":")) for proof in completed
+        )
+        with self.file_lock, self._io_lock:
+            self.flush()
+            if self._snapshot_seq() > seq:
+                # Another process wrote a newer snapshot while this one waited
+                self._compacting = False
+                return
+            atomic_write_lines(self.snapshot_file, lines)
+
+            # Events logged after the copy was taken stay in the journal.
+            # If we crash before this point the replay skips events by seq.
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            kept = []
+            if os.path.exists(self.journal_file):
+                with open(self.journal_file, "r", encoding="utf-8") as file:
+                    for line in file:
+                        if line.endswith("\n") and json.loads(line)["seq"] > seq:
+                            kept.append(line.rstrip("\n"))
+            atomic_write_lines(self.journal_file, kept)
+            self.journal_events = len(kept)
+            self._close_journal()  # The next change reads the new journal
+            self._journal_size = 0
+            self._compacting = False
+
+    def close(self):
+        """Flushes and closes the journal."""
+        with self.file_lock, self._io_lock:
+            self.flush()
+            self._close_journal()
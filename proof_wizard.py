@@ -8,32 +8,116 @@ a proof. It will allow for selection of a few different proof types. It will als
 allow to complete pending proofs.It uses ttkbootstrap for styling, so ttkbootstrap
 will need to be pip installed if that is ok.
 
+Startup only does what the first tab needs. ttkbootstrap, NumPy (Reports tab) and
+http.client (--server) are imported when they are used, the theme list is filled
+when the dropdown first opens, and images are decoded once on first use.
+"python proof_wizard.py --profile-startup" prints the time of each startup phase.
+
 """
 
-import datetime
-import json
+import time
+
+# Taken before the other imports so --profile-startup can time each of them.
+# A module shared by two groups is counted in the first one that imports it.
+STARTED = time.perf_counter()
+
+from perf_monitor import PERF_FILE, PerfMonitor, StartupProfile
+
+STARTUP = StartupProfile(STARTED)
+STARTUP.mark("import perf_monitor (proof_record)")
+
+import argparse
 import os
+import queue
+import threading
 import tkinter as tk
-from tkinter import PhotoImage, messagebox, ttk
+from tkinter import PhotoImage, filedialog, messagebox, ttk
+
+STARTUP.mark("import tkinter")
+
+from client_manager import ClientManager, parse_client_names
+
+STARTUP.mark("import client_manager (proof_db, proof_store)")
 
-from client_manager import ClientManager
-from ttkbootstrap import Style
+from proof_engine import PROOF_TYPES, ProofEngine, current_user, open_store
+
+STARTUP.mark("import proof_engine")
+
+from io_worker import IOWorker
+from proof_archive import ARCHIVE_AGE_DAYS, ProofArchive, archive_cutoff
+from proof_counters import today
+from proof_index import ProofList
+from proof_record import format_date
+from virtual_tree import VirtualTreeview
+
+STARTUP.mark("import other modules")
+
+IMAGE_DIR = "images"
+
+# Callbacks whose run time is recorded by the performance monitor
+TIMED_CALLBACKS = (
+    "make_proof",
+    "mark_proof_complete",
+    "cancel_selected_proofs",
+    "reassign_selected_proofs",
+    "sort_pending",
+    "sort_completed",
+    "add_client",
+    "add_clients",
+    "remove_selected_client",
+    "filter_client_combo",
+    "update_counts",
+    "show_client_counts",
+    "load_pending_proofs",
+    "load_completed_proofs",
+    "on_tab_changed",
+    "poll_history",
+    "flush_store",
+    "poll_io",
+)
 
 
 class ProofWizard(tk.Tk):
     """This is a tkinter module for generating proofs."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        db_file=None,
+        server_url=None,
+        diagnostics=False,
+        perf_file=PERF_FILE,
+        profile_startup=False,
+    ):
+        self.startup = STARTUP
+        self.startup.mark("start ProofWizard")
         super().__init__()
+        self.startup.mark("create window")
+        # Time the callbacks, before any of them is handed to a widget
+        self.monitor = PerfMonitor()
+        self.monitor.instrument(self, TIMED_CALLBACKS)
+        self.perf_file = perf_file
+        self.profile_startup = profile_startup
+        self.images = {}
+
+        # The theme has to be in place before the first widget is drawn
+        from ttkbootstrap import Style
+
+        self.startup.mark("import ttkbootstrap")
         self.style = Style(theme="solar")
+        self.startup.mark("load theme")
         self.title("Proof Wizard")
         self.geometry("1050x450")
         self.minsize(1050, 450)
         self.grid_rowconfigure(0, weight=1)
         self.grid_columnconfigure(0, weight=1)
-        self.icon_image = PhotoImage(file="images/icon.png")
-        self.iconphoto(False, self.icon_image)
-        self.client_manager = ClientManager()
+        if server_url:
+            # http.client is only needed to talk to a server
+            from proof_client import RemoteClientManager, RemoteProofStore
+
+            self.client_manager = RemoteClientManager(server_url)
+        else:
+            self.client_manager = ClientManager(db_file=db_file)
+        self.startup.mark("load clients")
 
         # Create a ttk Notebook for setting up multiple tabs
         self.nb = ttk.Notebook(self)
@@ -55,19 +139,58 @@ class ProofWizard(tk.Tk):
         self.frm_clients.grid_rowconfigure(1, weight=1)
         # self.frm_clients.grid_columnconfigure(1, weight=1)
 
+        # Create Reports frame for the "Reports" tab
+        self.frm_reports = ttk.Frame(self.nb)
+        self.nb.add(self.frm_reports, text="Reports")
+        self.frm_reports.grid_rowconfigure(1, weight=1)
+        self.frm_reports.grid_columnconfigure(0, weight=1)
+
         # Add the Instructions frame
         self.frm_instructions = ttk.Frame(self.nb)
         self.nb.add(self.frm_instructions, text="Instructions")
 
+        # Diagnostics tab with the performance numbers, only when asked for
+        self.frm_diagnostics = None
+        if diagnostics:
+            self.frm_diagnostics = ttk.Frame(self.nb)
+            self.nb.add(self.frm_diagnostics, text="Diagnostics")
+            self.frm_diagnostics.grid_rowconfigure(1, weight=1)
+            self.frm_diagnostics.grid_columnconfigure(0, weight=1)
+
         # Create a custom style for the Treeview
         self.style.configure("Treeview", borderwidth=1)
         # self.style.map("Treeview", background=[("selected", "darkblue")])
+        self.startup.mark("create tabs")
 
         # Get username from OS
         self.current_user = self.get_current_user()
-        self.clients = self.client_manager.load_clients()
-        self.pending_proofs = self.load_json("pending.json")
-        self.completed_proofs = self.load_json("completed.json")
+        # Only pending proofs are loaded here, the history is read in the background.
+        # With a server the proofs stay there and are fetched a page at a time.
+        self.server_url = server_url
+        if server_url:
+            self.store = RemoteProofStore(server_url)
+        else:
+            self.store = open_store(db_file).load_pending()
+        self.engine = ProofEngine(self.store, self.current_user)
+        self.startup.mark("load pending proofs")
+        # Disk writes run on one background thread
+        self.io_worker = IOWorker()
+        self.io_worker.timer = self.monitor.record_write
+        self.store.writer = self.io_worker.submit
+        self.client_manager.writer = self.io_worker.submit
+        self.pending_proofs = self.store.pending
+        self.completed_proofs = self.store.completed
+        # Large in-memory lists sort on another thread, poll_io() shows the result
+        self.sorted_lists = [
+            (proofs, redraw)
+            for proofs, redraw in (
+                (self.pending_proofs, self.load_pending_proofs),
+                (self.completed_proofs, self.load_completed_proofs),
+            )
+            if isinstance(proofs, ProofList)
+        ]
+        for proofs, _ in self.sorted_lists:
+            proofs.background_sorts = True
 
         # Sort state tracking
         self.pending_sort_order = {
@@ -82,12 +205,100 @@ class ProofWizard(tk.Tk):
             "date_completed": False,
             "completed_by": False,
         }
-
-        # Setting up the tabs
+        # Active sort as a list of (column, descending), shift-click adds columns
+        self.pending_sort_keys = []
+        self.completed_sort_keys = []
+
+        # Make sure pending writes are flushed when the window is closed
+        self.protocol("WM_DELETE_WINDOW", self.exit_app)
+        self.after(int(self.store.batch_interval * 1000), self.flush_store)
+        self.poll_io()
+        if server_url:
+            self.after(5000, self.refresh_remote)
+        self.monitor.start_heartbeat(self)
+
+        # Setting up the main tab, the other tabs are built on their first visit
+        self.completed_view = None
+        self.tab_setups = {
+            str(self.frm_completed): self.setup_frm_completed,
+            str(self.frm_clients): self.setup_frm_clients,
+            str(self.frm_reports): self.setup_frm_reports,
+            str(self.frm_instructions): self.setup_frm_instructions,
+        }
+        if diagnostics:
+            self.tab_setups[str(self.frm_diagnostics)] = self.setup_frm_diagnostics
         self.setup_frm_main()
-        self.setup_frm_completed()
-        self.setup_frm_instructions()
-        self.setup_frm_clients()
+        self.nb.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.startup.mark("build Proof Setup tab")
+
+        # Read the completed history in pages on a background thread
+        self.history_queue = queue.Queue()
+        self.history_thread = threading.Thread(target=self.read_history, daemon=True)
+        self.history_thread.start()
+        self.after(50, self.poll_history)
+        self.after_idle(self.finish_startup)
+
+    def finish_startup(self):
+        """Sets the window icon once the window is up and reports the startup
+        times."""
+        self.update_idletasks()
+        self.startup.mark("show window")
+        self.iconphoto(False, self.load_image("icon.png"))
+        self.startup.mark("load icon")
+        for name, seconds in self.startup.phases:
+            self.monitor.record(f"startup {name}", seconds)
+        if self.profile_startup:
+            print(self.startup.report())
+            self.exit_app()
+
+    def load_image(self, filename):
+        """Returns an image from the images folder, decoding it only once."""
+        image = self.images.get(filename)
+        if image is None:
+            image = PhotoImage(file=os.path.join(IMAGE_DIR, filename))
+            self.images[filename] = image
+        return image
+
+    def on_tab_changed(self, event):
+        """Builds a tab the first time it is shown."""
+        setup = self.tab_setups.pop(self.nb.select(), None)
+        if setup is not None:
+            setup()
+        elif self.nb.select() == str(self.frm_clients):
+            # Show clients that other workstations added or removed
+            if self.client_manager.reload_clients():
+                self.update_client_listbox()
+
+    def read_history(self):
+        """Background thread: reads completed proof pages for poll_history."""
+        try:
+            for page in self.store.read_completed_pages():
+                self.history_queue.put(page)
+            self.history_queue.put(None)
+        except Exception as error:
+            self.history_queue.put(error)
+
+    def poll_history(self):
+        """Adds pages read by the background thread to the completed proofs."""
+        for _ in range(5):
+            try:
+                page = self.history_queue.get_nowait()
+            except queue.Empty:
+                break
+            if page is None:
+                self.store.finish_loading()
+                for proofs, _ in self.sorted_lists:
+                    proofs.prepare_indexes()
+                self.load_completed_proofs()
+                return
+            if isinstance(page, Exception):
+                messagebox.showerror(
+                    "Load Error", f"Could not read the proof history.\n{page}"
+                )
+                return
+            self.store.add_completed_page(page)
+        self.load_completed_proofs()
+        self.after(50, self.poll_history)
 
     def setup_frm_main(self):
         """Creating widgets for the main tab."""
@@ -96,22 +307,32 @@ class ProofWizard(tk.Tk):
         self.lbl_user = ttk.Label(self.frm_main, text="User: " + self.current_user)
         self.lbl_user.grid(row=0, column=0, padx=10, pady=10, sticky="nw")
 
+        # Proof counts for the user and the chosen client, from the store counters
+        self.lbl_counts = ttk.Label(self.frm_main, text="", justify="left")
+        self.lbl_counts.grid(row=1, column=0, columnspan=3, padx=10, sticky="nw")
+
         # Client label
         self.lbl_client = ttk.Label(self.frm_main, text="Select Client:")
         self.lbl_client.grid(row=2, column=0, padx=10, pady=10, sticky="w")
 
         # Dropdown of client list
-        self.combo_client = ttk.Combobox(self.frm_main, values=self.clients)
+        self.combo_client = ttk.Combobox(
+            self.frm_main, values=self.client_manager.search_clients("")
+        )
         self.combo_client.grid(row=2, column=1, padx=10, pady=10)
+        # Filter the dropdown to matching clients while typing
+        self.client_search_job = None
+        self.combo_client.bind("<KeyRelease>", self.on_client_typed)
+        self.combo_client.bind(
+            "<<ComboboxSelected>>", lambda event: self.update_counts()
+        )
 
         # Proof type label
         self.lbl_proof_type = ttk.Label(self.frm_main, text="Select Proof Type:")
         self.lbl_proof_type.grid(row=3, column=0, padx=10, pady=10, sticky="nw")
 
         # Proof type dropdown
-        self.box_proof_type = ttk.Combobox(
-            self.frm_main, values=["Generic", "Approval"]
-        )
+        self.box_proof_type = ttk.Combobox(self.frm_main, values=list(PROOF_TYPES))
         self.box_proof_type.grid(row=3, column=1, padx=10, pady=10, sticky="nw")
 
         # Button to generate proofs
@@ -125,13 +346,14 @@ class ProofWizard(tk.Tk):
         # Get the current theme
         self.theme_var = tk.StringVar(value=self.style.theme_use())
 
-        # Setup theme dropdown and set the values
-        self.combo_theme = ttk.Combobox(self.frm_main, textvariable=self.theme_var)
-        self.combo_theme["values"] = self.style.theme_names()
+        # Setup theme dropdown, the values are filled when it first opens
+        self.combo_theme = ttk.Combobox(
+            self.frm_main, textvariable=self.theme_var, postcommand=self.list_themes
+        )
         self.combo_theme.grid(row=0, column=3, padx=10, pady=10, sticky="e")
 
         # Exit button to close application
-        self.btn_exit = ttk.Button(self.frm_main, text="Exit", command=self.quit)
+        self.btn_exit = ttk.Button(self.frm_main, text="Exit", command=self.exit_app)
         self.btn_exit.grid(row=4, column=0, columnspan=1, padx=10, pady=10, sticky="w")
 
         # Pending label
@@ -148,6 +370,22 @@ class ProofWizard(tk.Tk):
         self.pending_tree.grid(
             row=2, column=3, rowspan=3, padx=5, pady=10, sticky="nsew"
         )
+        # Vertical scrollbar for pending tree
+        self.pending_scrollbar = ttk.Scrollbar(self.frm_main, orient="vertical")
+        self.pending_scrollbar.grid(
+            row=2, column=3, rowspan=3, padx=5, pady=10, sticky="nse"
+        )
+        # Only the visible rows are created as tree items
+        self.pending_view = VirtualTreeview(
+            self.pending_tree,
+            self.pending_scrollbar,
+            row_values=lambda proof: (
+                format_date(proof.date_created),
+                proof.created_by,
+                proof.client,
+            ),
+            row_key=lambda proof: proof.id,
+        )
 
         self.pending_tree.heading(
             "Date Created",
@@ -164,11 +402,19 @@ class ProofWizard(tk.Tk):
              text="Client",
             command=lambda: self.sort_pending("client"),
         )
+        # Shift-click on a heading adds it as another sort column
+        self.pending_tree.bind(
+            "<Shift-Button-1>",
+            lambda event: self.heading_shift_click(
+                event, self.pending_tree, self.pending_sort_order, self.sort_pending
+            ),
+        )
         # Bind the combo selection event to the change_theme method
         self.combo_theme.bind("<<ComboboxSelected>>", self.change_theme)
 
         # Load pending proofs into the treeview
         self.load_pending_proofs()
+        self.update_counts()
 
         # Mark Complete button
         self.btn_mark_complete = ttk.Button(
@@ -176,13 +422,22 @@ class ProofWizard(tk.Tk):
         )
         self.btn_mark_complete.grid(row=3, column=2, padx=10, pady=10, sticky="ne")
 
+        # Cancel and reassign work on every selected pending proof at once
+        frm_bulk = ttk.Frame(self.frm_main)
+        frm_bulk.grid(row=4, column=2, padx=10, pady=10, sticky="ne")
+        self.btn_cancel = ttk.Button(
+            frm_bulk, text="Cancel Selected", command=self.cancel_selected_proofs
+        )
+        self.btn_cancel.grid(row=0, column=0, pady=(0, 10), sticky="e")
+        self.btn_reassign = ttk.Button(
+            frm_bulk, text="Reassign Selected", command=self.reassign_selected_proofs
+        )
+        self.btn_reassign.grid(row=1, column=0, sticky="e")
+
     def setup_frm_instructions(self):
         """Create a label for the instructions heading"""
-        # Load the logo image (adjust path to your logo)
-        self.logo_image = PhotoImage(file="images/logo.png")
-
         # Create a label to display the logo
-        logo_label = tk.Label(self.frm_instructions, image=self.logo_image)
+        logo_label = tk.Label(self.frm_instructions, image=self.load_image("logo.png"))
         logo_label.pack(pady=10)
 
         instructions_heading = tk.Label(
@@ -205,12 +460,17 @@ class ProofWizard(tk.Tk):
             "2. Completed Proofs Tab: This tab displays proofs that have been completed. "
             "You can review completed proofs here. \n\n"
             "3. Each column in the list of proofs can be sorted in ascending or descending "
-            "order by clicking on the column header.\n\n"
-            "4. (Future): Archiving Proofs: Select one or more completed proofs to archive them if the list becomes too long. "
-            "Archived proofs are saved to a separate file for future reference.\n\n"
+            "order by clicking on the column header. Hold Shift while clicking another "
+            "header to sort by more than one column.\n\n"
+            "4. Archiving Proofs: On the Completed Proofs tab, choose an age in days and click "
+            "'Archive Old Proofs' to move older completed proofs out of the list. "
+            "Archived proofs are saved to compressed monthly files in the archive folder.\n\n"
             "5. Exit: Use the 'Exit' button to close the application safely.\n\n"
             "6. Theme: Use the 'Theme' option to change the appearance of the application.\n\n"
             "7. Go to the Clients tab to view, add, or remove any client.\n\n"
+            "8. Bulk Changes: Select several pending proofs with Ctrl or Shift and use "
+            "'Cancel Selected' or 'Reassign Selected'. On the Clients tab, 'Add Clients...' "
+            "adds a pasted list or a file of names, and several clients can be removed at once.\n\n"
             "For any further assistance, please refer to the user manual or contact support."
         )
 
@@ -220,8 +480,8 @@ class ProofWizard(tk.Tk):
 
     def setup_frm_completed(self):
         """Sets up widgets for the completed proofs tab"""
-        lbl = ttk.Label(self.frm_completed, text="Completed Proofs")
-        lbl.grid(row=0, column=0, columnspan=1, pady=10)
+        self.lbl_completed = ttk.Label(self.frm_completed, text="Completed Proofs")
+        self.lbl_completed.grid(row=0, column=0, columnspan=1, pady=10)
 
         # Treeview for completed proofs
         self.completed_tree = ttk.Treeview(
@@ -237,10 +497,20 @@ class ProofWizard(tk.Tk):
             style="Treeview",
         )
         # Vertical scrollbar for completed tree
-        self.completed_scrollbar = ttk.Scrollbar(
-            self.frm_completed, orient="vertical", command=self.completed_tree.yview
+        self.completed_scrollbar = ttk.Scrollbar(self.frm_completed, orient="vertical")
+        # Only the visible rows are created as tree items
+        self.completed_view = VirtualTreeview(
+            self.completed_tree,
+            self.completed_scrollbar,
+            row_values=lambda proof: (
+                format_date(proof.date_created),
+                proof.created_by,
+                proof.client,
+                format_date(proof.date_completed),
+                proof.completed_by,
+            ),
+            row_key=lambda proof: proof.id,
         )
-        self.completed_tree.configure(yscrollcommand=self.completed_scrollbar.set)
         # Place the treeview and scrollbar using grid
         self.completed_tree.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
         self.completed_scrollbar.grid(row=1, column=0, pady=10, padx=10, sticky="nse")
@@ -271,8 +541,89 @@ class ProofWizard(tk.Tk):
             command=lambda: self.sort_completed("completed_by"),
         )
 
+        # Shift-click on a heading adds it as another sort column
+        self.completed_tree.bind(
+            "<Shift-Button-1>",
+            lambda event: self.heading_shift_click(
+                event,
+                self.completed_tree,
+                self.completed_sort_order,
+                self.sort_completed,
+            ),
+        )
+
+        # Archive controls below the completed proofs
+        self.archive = ProofArchive()
+        frm_archive = ttk.Frame(self.frm_completed)
+        frm_archive.grid(row=2, column=0, padx=5, pady=5, sticky="w")
+        ttk.Label(frm_archive, text="Archive proofs completed more than").grid(
+            row=0, column=0, padx=5
+        )
+        self.archive_days = tk.StringVar(value=str(ARCHIVE_AGE_DAYS))
+        self.spin_archive_days = ttk.Spinbox(
+            frm_archive, from_=1, to=3650, width=6, textvariable=self.archive_days
+        )
+        self.spin_archive_days.grid(row=0, column=1, padx=5)
+        ttk.Label(frm_archive, text="days ago").grid(row=0, column=2, padx=5)
+        self.btn_archive = ttk.Button(
+            frm_archive, text="Archive Old Proofs", command=self.archive_old_proofs
+        )
+        self.btn_archive.grid(row=0, column=3, padx=10)
+
         self.load_completed_proofs()
 
+    def archive_old_proofs(self):
+        """Moves completed proofs older than the chosen age to the archive."""
+        if not self.store.loaded:
+            messagebox.showinfo(
+                "Still Loading", "Please wait until the proof history has loaded."
+            )
+            return
+        try:
+            days = int(self.archive_days.get())
+        except ValueError:
+            messagebox.showerror("Input Error", "Please enter a number of days.")
+            return
+
+        try:
+            proofs = self.store.archive_candidates(archive_cutoff(days))
+        except RuntimeError as error:
+            messagebox.showerror("Archive Error", str(error))
+            return
+        if not proofs:
+            messagebox.showinfo(
+                "Nothing to Archive", f"No proofs were completed more than {days} days ago."
+            )
+            return
+        confirm = messagebox.askyesno(
+            "Confirm Archive", f"Are you sure you want to archive {len(proofs)} proofs?"
+        )
+        if not confirm:
+            return
+
+        # The archive files are written on the I/O worker, the list is updated after
+        proof_ids = [proof.id for proof in proofs]
+        self.btn_archive.config(state="disabled")
+        self.io_worker.submit(
+            self.archive.directory,
+            lambda: self.archive.add(proofs),
+            on_done=lambda result, error: self.finish_archive(proof_ids, error),
+        )
+
+    def finish_archive(self, proof_ids, error):
+        """Removes archived proofs from the completed list once they are saved."""
+        self.btn_archive.config(state="normal")
+        if error is not None:
+            messagebox.showerror("Archive Error", f"Could not archive proofs.\n{error}")
+            return
+        archived = self.store.archive_proofs(proof_ids)
+        self.load_completed_proofs()
+        messagebox.showinfo(
+            "Archive Result",
+            f"{len(archived)} proofs archived, "
+            f"{self.archive.count()} in the archive altogether.",
+        )
+
     def setup_frm_clients(self):
         """Sets up widgets for the clients proofs tab"""
         # Button to add a new client
@@ -285,23 +636,37 @@ class ProofWizard(tk.Tk):
             self.frm_clients, text="Remove Client", command=self.remove_selected_client
         )
         self.btn_remove_client.grid(row=1, column=0, padx=10, pady=10, sticky="n")
+        # Button to add many clients from a pasted list or a file
+        self.btn_add_clients = ttk.Button(
+            self.frm_clients, text="Add Clients...", command=self.add_clients_popup
+        )
+        self.btn_add_clients.grid(row=1, column=0, padx=10, pady=60, sticky="n")
 
         # Clients label
         lbl = ttk.Label(self.frm_clients, text="Clients")
         lbl.grid(row=0, column=1, columnspan=1, pady=10)
 
         # Clients Listbox
-        self.client_listbox = tk.Listbox(self.frm_clients, width=40)
+        self.client_listbox = tk.Listbox(
+            self.frm_clients, width=40, selectmode=tk.EXTENDED
+        )
         self.client_listbox.grid(
             row=1, column=1, ipady=3, ipadx=1, padx=2, pady=5, sticky="nsew"
         )
         self.client_listbox.grid_columnconfigure(0, weight=1)
+        self.client_listbox.bind("<<ListboxSelect>>", self.show_client_counts)
         self.update_client_listbox()
 
+        # Proof counts for the selected clients
+        self.lbl_client_counts = ttk.Label(self.frm_clients, text="")
+        self.lbl_client_counts.grid(row=2, column=1, padx=2, pady=5, sticky="w")
+        self.show_client_counts()
+
         # Vertical scrollbar for clients list
         self.clients_scrollbar = ttk.Scrollbar(
-            self.frm_clients, orient="vertical", command=self.completed_tree.yview
+            self.frm_clients, orient="vertical", command=self.client_listbox.yview
         )
+        self.client_listbox.configure(yscrollcommand=self.clients_scrollbar.set)
         self.clients_scrollbar.grid(row=1, column=1, padx=3, pady=7, sticky="nse")
 
     def add_client_popup(self):
@@ -334,70 +699,315 @@ class ProofWizard(tk.Tk):
         else:
             messagebox.showerror("Empty Input Error", "Please enter a client to add.")
 
-    def remove_selected_client(self):
-        """Removes the selected client from the list."""
-        try:
-            selected_index = self.client_listbox.curselection()[0]
-            selected_client = self.client_listbox.get(selected_index)
-
-            confirm = messagebox.askyesno(
-                "Confirm Remove",
-                f"Are you sure you want to remove '{selected_client}'?",
+    def add_clients_popup(self):
+        """Opens a popup for adding many clients, one per line."""
+        popup = tk.Toplevel(self)
+        popup.title("Add Clients")
+        tk.Label(popup, text="Paste client names, one per line:").grid(
+            row=0, column=0, columnspan=2, padx=10, pady=10, sticky="w"
+        )
+        names_text = tk.Text(popup, width=50, height=15)
+        names_text.grid(row=1, column=0, columnspan=2, padx=10, pady=5)
+
+        def load_file():
+            filename = filedialog.askopenfilename(
+                parent=popup,
+                title="Client List",
+                filetypes=[("Text files", "*.txt *.csv"), ("All files", "*.*")],
             )
-            if confirm:
-                self.client_manager.remove_client(selected_client)
-                self.update_client_listbox()
+            if not filename:
+                return
+            try:
+                with open(filename, "r", encoding="utf-8") as file:
+                    names_text.insert(tk.END, file.read())
+            except (OSError, UnicodeDecodeError) as error:
+                messagebox.showerror(
+                    "File Error", f"Could not read the file.\n{error}", parent=popup
+                )
+
+        ttk.Button(popup, text="Load File...", command=load_file).grid(
+            row=2, column=0, padx=10, pady=10, sticky="w"
+        )
+        ttk.Button(
+            popup,
+            text="Add All",
+            command=lambda: self.add_clients(names_text.get("1.0", tk.END), popup),
+        ).grid(row=2, column=1, padx=10, pady=10, sticky="e")
+
+    def add_clients(self, text, popup):
+        """Adds every client in the text with one save and one list update."""
+        names = parse_client_names(text)
+        if not names:
+            messagebox.showerror(
+                "Empty Input Error", "Please enter clients to add.", parent=popup
+            )
+            return
+        added = self.client_manager.add_clients(names)
+        self.update_client_listbox()
+        popup.destroy()
+        messagebox.showinfo(
+            "Input Result",
+            f"{len(added)} clients added, {len(names) - len(added)} already existed.",
+        )
 
-        except IndexError:
+    def remove_selected_client(self):
+        """Removes the selected clients from the list."""
+        selected_clients = [
+            self.client_listbox.get(index)
+            for index in self.client_listbox.curselection()
+        ]
+        if not selected_clients:
             messagebox.showerror(
                 "Selection Error",
                 "No client selected. Please select a client to remove.",
             )
+            return
+
+        if len(selected_clients) == 1:
+            question = f"Are you sure you want to remove '{selected_clients[0]}'?"
+        else:
+            question = (
+                f"Are you sure you want to remove {len(selected_clients)} clients?"
+            )
+        if messagebox.askyesno("Confirm Remove", question):
+            self.client_manager.remove_clients(selected_clients)
+            self.update_client_listbox()
 
     def update_client_listbox(self):
         """Updates the listbox with the current list of clients."""
         self.client_listbox.delete(0, tk.END)  # Clear the listbox
-        for client in self.client_manager.get_clients():
-            self.client_listbox.insert(tk.END, client)
+        self.client_listbox.insert(tk.END, *self.client_manager.get_clients())
+        self.filter_client_combo()
+
+    def show_client_counts(self, event=None):
+        """Shows the pending and completed proofs of the selected clients."""
+        selected_clients = [
+            self.client_listbox.get(index)
+            for index in self.client_listbox.curselection()
+        ]
+        if not selected_clients:
+            self.lbl_client_counts.config(text="Select clients to see their proofs.")
+            return
+        pending = completed = 0
+        for client in selected_clients:
+            counts = self.store.counters.summary(client=client)
+            pending += counts["pending_client"]
+            completed += counts["completed_client"]
+        if len(selected_clients) == 1:
+            name = selected_clients[0]
+        else:
+            name = f"{len(selected_clients)} clients"
+        self.lbl_client_counts.config(
+            text=f"{name}: {pending} pending, {completed} completed"
+        )
 
-    def load_json(self, filename):
-        """Load JSON data from a file."""
+    def on_client_typed(self, event):
+        """Waits for a short pause in typing before filtering the client list."""
+        if event.keysym in ("Up", "Down", "Return", "Escape", "Tab"):
+            return
+        if self.client_search_job is not None:
+            self.after_cancel(self.client_search_job)
+        self.client_search_job = self.after(150, self.filter_client_combo)
+
+    def filter_client_combo(self):
+        """Shows the best matches for the typed text in the client dropdown."""
+        self.client_search_job = None
+        matches = self.client_manager.search_clients(self.combo_client.get())
+        self.combo_client["values"] = matches
+        self.update_counts()
+
+    def update_counts(self):
+        """Shows the user's counts for today and the chosen client's counts."""
+        client = self.combo_client.get().strip() or None
+        counts = self.store.counters.summary(
+            client=client, user=self.current_user, day=today()
+        )
+        lines = [
+            f"Your proofs: {counts['pending_user']} pending, "
+            f"{counts['completed_user_day']} completed today"
+        ]
+        if client is not None:
+            lines.append(
+                f"{client}: {counts['pending_client']} pending, "
+                f"{counts['completed_client']} completed"
+            )
+        self.lbl_counts.config(text="\n".join(lines))
+
+    def setup_frm_reports(self):
+        """Sets up widgets for the reports tab"""
         try:
-            with open(filename, "r", encoding="utf-8") as file:
-                return json.load(file)
-        except FileNotFoundError:
-            return []
+            import proof_report  # NumPy is slow to import, so only for this tab
+        except ImportError:
+            ttk.Label(
+                self.frm_reports, text="Reports need NumPy: pip install numpy"
+            ).grid(row=0, column=0, padx=10, pady=10)
+            return
+        self.proof_report = proof_report
+        frm_controls = ttk.Frame(self.frm_reports)
+        frm_controls.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        self.report_name = tk.StringVar(value=next(iter(proof_report.REPORTS)))
+        self.cmb_report = ttk.Combobox(
+            frm_controls,
+            textvariable=self.report_name,
+            values=list(proof_report.REPORTS),
+            state="readonly",
+            width=32,
+        )
+        self.cmb_report.grid(row=0, column=0, padx=5)
+        self.cmb_report.bind("<<ComboboxSelected>>", lambda event: self.run_report())
+        self.btn_report = ttk.Button(
+            frm_controls, text="Refresh", command=self.run_report
+        )
+        self.btn_report.grid(row=0, column=1, padx=10)
+        self.lbl_report = ttk.Label(frm_controls, text="")
+        self.lbl_report.grid(row=0, column=2, padx=5)
+
+        # Treeview for the report, the columns change with the report
+        self.report_tree = ttk.Treeview(
+            self.frm_reports, show="headings", style="Treeview"
+        )
+        self.report_tree.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+        self.report_scrollbar = ttk.Scrollbar(
+            self.frm_reports, orient="vertical", command=self.report_tree.yview
+        )
+        self.report_tree.configure(yscrollcommand=self.report_scrollbar.set)
+        self.report_scrollbar.grid(row=1, column=0, pady=10, padx=10, sticky="nse")
+
+        self.report_queue = queue.Queue()
+        self.run_report()
+
+    def run_report(self):
+        """Copies the proofs and computes the chosen report on a background thread."""
+        if not self.store.loaded:
+            self.lbl_report.config(text="Waiting for the proof history to load...")
+            self.after(500, self.run_report)
+            return
+        proofs = list(self.store.pending) + list(self.store.completed)
+        report = self.proof_report.REPORTS[self.report_name.get()]
+        self.btn_report.config(state="disabled")
+        self.lbl_report.config(text=f"Reporting on {len(proofs)} proofs...")
+        threading.Thread(
+            target=self.read_report, args=(proofs, report), daemon=True
+        ).start()
+        self.after(50, self.poll_report)
+
+    def read_report(self, proofs, report):
+        """Background thread: builds the proof table and the report rows."""
+        try:
+            start = time.perf_counter()
+            table = self.proof_report.ProofTable(proofs)
+            built = time.perf_counter()
+            columns, rows = report(table)
+            done = time.perf_counter()
+            self.report_queue.put((columns, rows, built - start, done - built))
+        except Exception as error:
+            self.report_queue.put(error)
+
+    def poll_report(self):
+        """Shows the report rows once the background thread has them."""
+        try:
+            result = self.report_queue.get_nowait()
+        except queue.Empty:
+            self.after(50, self.poll_report)
+            return
+        self.btn_report.config(state="normal")
+        if isinstance(result, Exception):
+            self.lbl_report.config(text="")
+            messagebox.showerror("Report Error", f"Could not build the report.\n{result}")
+            return
+        columns, rows, build_time, report_time = result
+        self.report_tree.delete(*self.report_tree.get_children())
+        self.report_tree.configure(columns=columns)
+        for column in columns:
+            self.report_tree.heading(column, text=column)
+            self.report_tree.column(column, width=120, anchor="w")
+        for row in rows:
+            self.report_tree.insert("", tk.END, values=row)
+        self.lbl_report.config(
+            text=f"{len(rows)} rows, table built in {build_time:.2f}s, "
+            f"report in {report_time * 1000:.0f}ms"
+        )
 
-    def save_json(self, data, filename):
-        """Save JSON data to a file."""
-        with open(filename, "w", encoding="utf-8") as file:
-            json.dump(data, file, indent=4)
+    def setup_frm_diagnostics(self):
+        """Sets up widgets for the diagnostics tab"""
+        frm_controls = ttk.Frame(self.frm_diagnostics)
+        frm_controls.grid(row=0, column=0, padx=5, pady=5, sticky="w")
+        ttk.Button(
+            frm_controls, text="Reset", command=self.reset_diagnostics
+        ).grid(row=0, column=0, padx=5)
+        ttk.Button(
+            frm_controls, text="Save Report", command=self.save_diagnostics
+        ).grid(row=0, column=1, padx=5)
+        ttk.Label(
+            frm_controls, text="Times in milliseconds, updated every second"
+        ).grid(row=0, column=2, padx=10)
+
+        columns = ("Operation", "Count", "Mean", "p50", "p95", "p99", "Max")
+        self.diagnostics_tree = ttk.Treeview(
+            self.frm_diagnostics, columns=columns, show="headings", style="Treeview"
+        )
+        for column in columns:
+            self.diagnostics_tree.heading(column, text=column)
+            self.diagnostics_tree.column(
+                column, width=220 if column == "Operation" else 80, anchor="w"
+            )
+        self.diagnostics_tree.grid(row=1, column=0, padx=5, pady=5, sticky="nsew")
+        self.refresh_diagnostics()
+
+    def refresh_diagnostics(self):
+        """Shows the current timings while the diagnostics tab is open."""
+        if self.nb.select() == str(self.frm_diagnostics):
+            self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+            for name, stats in self.monitor.summary().items():
+                self.diagnostics_tree.insert(
+                    "",
+                    tk.END,
+                    values=(
+                        name,
+                        stats["count"],
+                        stats["mean_ms"],
+                        stats["p50_ms"],
+                        stats["p95_ms"],
+                        stats["p99_ms"],
+                        stats["max_ms"],
+                    ),
+                )
+        self.after(1000, self.refresh_diagnostics)
+
+    def reset_diagnostics(self):
+        """Clears the timings so a slow action can be measured on its own."""
+        self.monitor.reset()
+        self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+
+    def save_diagnostics(self):
+        """Writes the timings to the performance report file now."""
+        try:
+            self.monitor.dump(self.perf_file)
+        except OSError as error:
+            messagebox.showerror("Save Error", f"Could not save the report.\n{error}")
+            return
+        messagebox.showinfo("Report Saved", f"Timings saved to {self.perf_file}.")
 
     def make_proof(self):
-        """Generates a proof and adds it to pending or completed JSON files."""
-        client = self.combo_client.get()
-        proof_type = self.box_proof_type.get()
-
-        # Get current datetime
-        current_datetime = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        new_proof = {
-            "client": client,
-            "proof_type": proof_type,
-            "created_by": self.current_user,
-            "date_created": current_datetime,
-        }
+        """Generates a proof and adds it to the pending or completed proofs."""
+        try:
+            proof = self.engine.create_proof(
+                self.combo_client.get(), self.box_proof_type.get()
+            )
+        except ValueError as error:
+            messagebox.showerror("Input Error", str(error))
+            return
 
-        if proof_type == "Approval":
-            self.pending_proofs.append(new_proof)
-            self.save_json(self.pending_proofs, "pending.json")
-            self.load_pending_proofs()
-        else:
-            new_proof["date_completed"] = current_datetime
-            new_proof["completed_by"] = self.current_user
-            self.completed_proofs.append(new_proof)
-            self.save_json(self.completed_proofs, "completed.json")
+        if proof.is_completed:
             self.load_completed_proofs()
+        else:
+            self.load_pending_proofs()
+        self.update_counts()
+
+    def list_themes(self):
+        """Fills the theme dropdown the first time it opens."""
+        if not self.combo_theme["values"]:
+            self.combo_theme["values"] = self.style.theme_names()
 
     def change_theme(self, selected_theme):
         """Changes the theme of the application based on the dropdown selection."""
@@ -406,78 +1016,200 @@ class ProofWizard(tk.Tk):
 
     def load_pending_proofs(self):
         """Load pending proofs into the treeview."""
-        for item in self.pending_tree.get_children():
-            self.pending_tree.delete(item)
-        for proof in self.pending_proofs:
-            self.pending_tree.insert(
-                "",
-                "end",
-                values=(proof["date_created"],
-                        proof["created_by"],
-                        proof["client"]),
-            )
+        self.pending_view.set_rows(self.pending_proofs.view(self.pending_sort_keys))
 
     def load_completed_proofs(self):
         """Load completed proofs into the treeview."""
-        for item in self.completed_tree.get_children():
-            self.completed_tree.delete(item)
-        for proof in self.completed_proofs:
-            self.completed_tree.insert(
-                "",
-                "end",
-                values=(
-                    proof["date_created"],
-                    proof["created_by"],
-                    proof["client"],
-                    proof["date_completed"],
-                    proof["completed_by"],
-                ),
+        if self.completed_view is None:
+            return  # The Completed Proofs tab has not been opened yet
+        if self.store.loaded:
+            self.lbl_completed.config(text="Completed Proofs")
+        else:
+            self.lbl_completed.config(
+                text=f"Completed Proofs (loading, {len(self.completed_proofs)} so far)"
+            )
+        self.completed_view.set_rows(
+            self.completed_proofs.view(self.completed_sort_keys)
+        )
+
+    def selected_proof_ids(self):
+        """Returns the ids of the selected pending proofs, or shows an error and
+        returns an empty list."""
+        selected_ids = [proof.id for proof in self.pending_view.selection()]
+        if not selected_ids:
+            messagebox.showerror(
+                "Selection Error", "No proofs selected. Please select pending proofs."
             )
+        return selected_ids
+
+    def finish_bulk_change(self, completed=False):
+        """Redraws the lists once after a change to the selected proofs."""
+        self.pending_view.clear_selection(redraw=False)
+        self.load_pending_proofs()
+        if completed:
+            self.load_completed_proofs()
+        self.update_counts()
 
     def mark_proof_complete(self):
         """Marks selected pending proofs as complete."""
-        selected_items = self.pending_tree.selection()
-
-        current_datetime = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        for item in selected_items:
-            proof_values = self.pending_tree.item(item, "values")
-            for proof in self.pending_proofs:
-                if (
-                    proof["date_created"],
-                    proof["created_by"],
-                    proof["client"],
-                ) == proof_values:
-                    proof["date_completed"] = current_datetime
-                    proof["completed_by"] = self.current_user
-                    self.completed_proofs.append(proof)
-                    self.pending_proofs.remove(proof)
-                    break
-        self.save_json(self.pending_proofs, "pending.json")
-        self.save_json(self.completed_proofs, "completed.json")
+        selected_ids = self.selected_proof_ids()
+        if not selected_ids:
+            return
+        self.engine.complete_proofs(selected_ids)
+        self.finish_bulk_change(completed=True)
+
+    def cancel_selected_proofs(self):
+        """Cancels the selected pending proofs after asking to confirm."""
+        selected_ids = self.selected_proof_ids()
+        if not selected_ids:
+            return
+        confirm = messagebox.askyesno(
+            "Confirm Cancel",
+            f"Are you sure you want to cancel {len(selected_ids)} pending proofs?",
+        )
+        if confirm:
+            self.engine.cancel_proofs(selected_ids)
+            self.finish_bulk_change()
+
+    def reassign_selected_proofs(self):
+        """Asks for a user and gives the selected pending proofs to them."""
+        selected_ids = self.selected_proof_ids()
+        if not selected_ids:
+            return
+        popup = tk.Toplevel(self)
+        popup.title("Reassign Proofs")
+        tk.Label(
+            popup, text=f"Give {len(selected_ids)} proofs to user:"
+        ).grid(row=0, column=0, padx=10, pady=10)
+        user_entry = tk.Entry(popup)
+        user_entry.grid(row=0, column=1, padx=10, pady=10)
+        user_entry.focus_set()
+
+        def submit():
+            try:
+                self.engine.reassign_proofs(selected_ids, user_entry.get())
+            except ValueError as error:
+                messagebox.showerror("Input Error", str(error), parent=popup)
+                return
+            popup.destroy()
+            self.finish_bulk_change()
+
+        ttk.Button(popup, text="Reassign", command=submit).grid(
+            row=1, column=0, columnspan=2, padx=10, pady=10, sticky="e"
+        )
+
+    def flush_store(self):
+        """Periodically fsyncs journal events that are still waiting for a batch,
+        and shows proofs that other workstations changed."""
+        if self.store.refresh():
+            self.load_pending_proofs()
+            self.load_completed_proofs()
+            self.update_counts()
+        self.store.request_flush()
+        self.after(int(self.store.batch_interval * 1000), self.flush_store)
+
+    def refresh_remote(self):
+        """Shows proofs that other workstations added through the server."""
         self.load_pending_proofs()
         self.load_completed_proofs()
+        self.update_counts()
+        self.after(5000, self.refresh_remote)
+
+    def poll_io(self):
+        """Reports errors from the background writer on the Tk thread."""
+        for error in self.io_worker.poll():
+            messagebox.showerror("Save Error", f"Could not save changes.\n{error}")
+        for proofs, redraw in self.sorted_lists:
+            if proofs.finish_sorts():
+                redraw()
+        if self.client_manager.sync():
+            if str(self.frm_clients) in self.tab_setups:
+                self.filter_client_combo()
+            else:
+                self.update_client_listbox()
+        self.after(100, self.poll_io)
+
+    def exit_app(self):
+        """Waits for queued writes, flushes the proof journal and closes the
+        application."""
+        self.store.request_flush()
+        self.io_worker.stop()
+        for error in self.io_worker.poll():
+            messagebox.showerror("Save Error", f"Could not save changes.\n{error}")
+        self.store.close()
+        try:
+            self.monitor.dump(self.perf_file)
+        except OSError as error:
+            print(f"Could not write {self.perf_file}: {error}")
+        self.destroy()
 
     def get_current_user(self):
         """Get the current user name."""
-        return os.getlogin()
-
-    def sort_pending(self, column):
+        return current_user()
+
+    def update_sort_keys(self, sort_keys, sort_order, column, add):
+        """Toggles a column's direction and makes it the sort, or adds it as
+        another sort column when add is True."""
+        sort_order[column] = not sort_order[column]
+        if not add:
+            sort_keys[:] = [(column, sort_order[column])]
+            return
+        for index, (key_column, _) in enumerate(sort_keys):
+            if key_column == column:
+                sort_keys[index] = (column, sort_order[column])
+                return
+        sort_keys.append((column, sort_order[column]))
+
+    def heading_shift_click(self, event, tree, sort_order, sort_command):
+        """Sorts by an extra column when a heading is shift-clicked."""
+        if tree.identify_region(event.x, event.y) != "heading":
+            return None
+        column_number = int(tree.identify_column(event.x).lstrip("#")) - 1
+        sort_command(list(sort_order)[column_number], add=True)
+        return "break"
+
+    def sort_pending(self, column, add=False):
         """Sorts pending proofs based on the selected column."""
-        self.pending_sort_order[column] = not self.pending_sort_order[column]
-        self.pending_proofs.sort(
-            key=lambda x: x[column], reverse=self.pending_sort_order[column]
+        self.update_sort_keys(
+            self.pending_sort_keys, self.pending_sort_order, column, add
         )
         self.load_pending_proofs()
 
-    def sort_completed(self, column):
+    def sort_completed(self, column, add=False):
         """Sorts completed proofs based on the selected column."""
-        self.completed_sort_order[column] = not self.completed_sort_order[column]
-        self.completed_proofs.sort(
-            key=lambda x: x[column], reverse=self.completed_sort_order[column]
+        self.update_sort_keys(
+            self.completed_sort_keys, self.completed_sort_order, column, add
         )
         self.load_completed_proofs()
 
 
 if __name__ == "__main__":
-    app = ProofWizard()
+    parser = argparse.ArgumentParser(description="Proof Wizard")
+    parser.add_argument(
+        "--db", help="use a SQLite database file instead of the JSON journal"
+    )
+    parser.add_argument(
+        "--server", help="use a proof server, for example http://127.0.0.1:8765"
+    )
+    parser.add_argument(
+        "--diagnostics", action="store_true", help="show the Diagnostics tab"
+    )
+    parser.add_argument(
+        "--perf-file",
+        default=PERF_FILE,
+        help=f"where to write the timings on exit (default: {PERF_FILE})",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print the time of each startup phase and exit",
+    )
+    args = parser.parse_args()
+    app = ProofWizard(
+        db_file=args.db,
+        server_url=args.server,
+        diagnostics=args.diagnostics,
+        perf_file=args.perf_file,
+        profile_startup=args.profile_startup,
+    )
     app.mainloop()
@@ -0,0 +1,125 @@
+"""
+File: stress.py
+Purpose: Multi-process stress test for the shared proof journal and client list.
+Several processes add, complete and cancel proofs and add clients in the same
+directory at the same time, with a low compaction threshold so snapshots are
+rewritten while the others are writing. Afterwards the files are loaded again
+and checked for lost or duplicated records.
+
+Example:
+    python stress.py --processes 8 --proofs 500
+    python stress.py --processes 3 --proofs 1500  # Longer batches
+
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+from client_manager import ClientManager
+from io_worker import IOWorker
+from proof_record import Proof, timestamp
+from proof_store import JOURNAL_FILE, SNAPSHOT_FILE, ProofStore
+
+
+def open_store(directory, compact_threshold=1000):
+    """Opens the proof store files in the test directory."""
+    return ProofStore(
+        snapshot_file=os.path.join(directory, SNAPSHOT_FILE),
+        journal_file=os.path.join(directory, JOURNAL_FILE),
+        pending_file=os.path.join(directory, "pending.json"),
+        completed_file=os.path.join(directory, "completed.json"),
+        compact_threshold=compact_threshold,
+    ).load()
+
+
+def worker(directory, number, proofs, clients):
+    """One process: adds proofs, completes every third and cancels every fifth of
+    its own, and adds its clients. Odd numbered processes save on an I/O worker
+    thread like the GUI does. Every third process first adds its proofs in one
+    batch, as an import does, so compactions run in the middle of a change.
+    Returns (completed, cancelled) counts."""
+    store = open_store(directory, compact_threshold=200)
+    client_manager = ClientManager(os.path.join(directory, "clients.json"))
+    io_worker = IOWorker()
+    if number % 2:
+        store.writer = io_worker.submit
+        client_manager.writer = io_worker.submit
+    completed = cancelled = 0
+    new_proofs = [
+        Proof(f"Client {number}", "Approval", f"user{number}", timestamp())
+        for index in range(proofs)
+    ]
+    if number % 3 == 2:
+        new_proofs = store.add_proofs(new_proofs)
+    for index, proof in enumerate(new_proofs):
+        if proof.id is None:
+            proof = store.add_proof(proof)
+        if index % 3 == 0:
+            completed += len(
+                store.complete_proofs([proof.id], f"user{number}", timestamp())
+            )
+        elif index % 5 == 0:
+            cancelled += len(store.cancel_proofs([proof.id]))
+        if index < clients:
+            client_manager.add_client(f"Client {number}-{index}")
+    io_worker.stop()
+    for error in io_worker.poll():
+        raise error
+    store.close()
+    return completed, cancelled
+
+
+def run(directory, processes, proofs, clients):
+    """Runs the workers and checks the result. Returns True if nothing was lost."""
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.starmap(
+            worker,
+            [(directory, number, proofs, clients) for number in range(processes)],
+        )
+    elapsed = time.perf_counter() - start
+
+    completed = sum(result[0] for result in results)
+    cancelled = sum(result[1] for result in results)
+    store = open_store(directory)
+    ids = [proof.id for proof in store.pending] + [
+        proof.id for proof in store.completed
+    ]
+    client_count = len(ClientManager(os.path.join(directory, "clients.json")).clients)
+
+    expected = processes * proofs - cancelled
+    checks = {
+        "proofs": (len(ids), expected),
+        "completed": (len(store.completed), completed),
+        "unique ids": (len(set(ids)), expected),
+        "clients": (client_count, processes * min(proofs, clients)),
+    }
+    print(f"{processes} processes x {proofs} proofs in {elapsed:.2f}s")
+    ok = True
+    for name, (found, wanted) in checks.items():
+        status = "ok" if found == wanted else "LOST"
+        ok = ok and found == wanted
+        print(f"  {name}: {found} of {wanted} {status}")
+    return ok
+
+
+def main():
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Multi-process stress test.")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--proofs", type=int, default=500, help="proofs per process")
+    parser.add_argument("--clients", type=int, default=50, help="clients per process")
+    parser.add_argument("--dir", help="directory for the files (default: a temp dir)")
+    args = parser.parse_args()
+    directory = args.dir or tempfile.mkdtemp(prefix="proof_stress_")
+    print(f"Writing to {directory}")
+    ok = run(directory, args.processes, args.proofs, args.clients)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+File: virtual_tree.py
+Purpose: Windowed rendering for a ttk.Treeview. Only the rows that are visible
+(plus a few extra above and below) are created as Tk items, so the cost of drawing
+a list depends on the height of the window and not on the number of proofs.
+
+"""
+
+from tkinter import ttk
+
+
+class VirtualTreeview:
+    """Shows a long sequence of records in a Treeview one window at a time.
+
+    The records can be any sequence that supports len() and slicing. Each row
+    uses the record key as its Treeview iid, and a redraw only inserts, moves or
+    deletes the rows that changed since the last one. The selection is remembered
+    by record key so it survives scrolling rows out of view.
+    """
+
+    def __init__(self, tree, scrollbar, row_values, row_key, overscan=10):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.row_values = row_values
+        self.row_key = row_key
+        self.overscan = overscan
+
+        self.rows = []
+        self.top = 0
+        self.start = 0
+        self.visible = int(tree.cget("height")) or 10
+        self.selected = {}
+
+        self._window = []
+        self._window_records = {}
+        self._values = {}
+        self._rendering = False
+
+        self.scrollbar.configure(command=self.yview)
+        self.tree.configure(yscrollcommand=self._on_tree_scroll)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self._scroll_units(-3))
+        self.tree.bind("<Button-5>", lambda event: self._scroll_units(3))
+        self.tree.bind("<Prior>", lambda event: self._scroll_units(-self.visible))
+        self.tree.bind("<Next>", lambda event: self._scroll_units(self.visible))
+
+    def set_rows(self, rows):
+        """Switches to a new sequence of records and redraws the window."""
+        self.rows = rows
+        self.render(self.top)
+
+    def refresh(self):
+        """Redraws the current window, for example after the records changed."""
+        self.render(self.top)
+
+    def selection(self):
+        """Returns the selected records, including ones scrolled out of view."""
+        return list(self.selected.values())
+
+    def clear_selection(self, redraw=True):
+        """Forgets the selected records. Pass redraw=False when set_rows() is
+        called right after anyway."""
+        self.selected.clear()
+        if redraw:
+            self.render(self.top)
+
+    def render(self, top):
+        """Materializes the rows around the given top row."""
+        count = len(self.rows)
+        top = max(0, min(top, count - self.visible))
+        start = max(0, top - self.overscan)
+        stop = min(count, top + self.visible + self.overscan)
+        records = self.rows[start:stop]
+
+        self._rendering = True
+        try:
+            self._apply_diff(records)
+            self.top = top
+            self.start = start
+            if records:
+                self.tree.yview_moveto((top - start) / len(records))
+        finally:
+            self._rendering = False
+        self._update_scrollbar()
+
+    def _apply_diff(self, records):
+        """Changes the tree items from the previous window to the new one."""
+        window = [str(self.row_key(record)) for record in records]
+        window_records = dict(zip(window, records))
+
+        # Delete rows that left the window
+        gone = [iid for iid in self._window if iid not in window_records]
+        if gone:
+            self.tree.delete(*gone)
+            for iid in gone:
+                del self._values[iid]
+        kept = [iid for iid in self._window if iid in window_records]
+
+        # Walk the new window, leaving rows that are already in place alone
+        placed = set()
+        position = 0
+        for index, iid in enumerate(window):
+            while position < len(kept) and kept[position] in placed:
+                position += 1
+            values = self.row_values(window_records[iid])
+            if position < len(kept) and kept[position] == iid:
+                position += 1
+            elif iid in self._values:
+                self.tree.move(iid, "", index)
+            else:
+                self.tree.insert("", index, iid=iid, values=values)
+                self._values[iid] = values
+            placed.add(iid)
+            if self._values[iid] != values:
+                self.tree.item(iid, values=values)
+                self._values[iid] = values
+
+        selected = [
+            iid
+            for iid, record in window_records.items()
+            if self.row_key(record) in self.selected
+        ]
+        if set(selected) != set(self.tree.selection()):
+            self.tree.selection_set(selected)
+
+        self._window = window
+        self._window_records = window_records
+
+    def yview(self, *args):
+        """Scrollbar command handling "moveto" and "scroll" requests."""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self.render(int(float(args[1]) * len(self.rows)))
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                amount *= self.visible
+            self._scroll_units(amount)
+
+    def _scroll_units(self, amount):
+        """Scrolls the window by a number of rows."""
+        self.render(self.top + amount)
+        return "break"
+
+    def _on_mousewheel(self, event):
+        """Scrolls on the mouse wheel (Windows and macOS deltas)."""
+        step = -1 if event.delta > 0 else 1
+        return self._scroll_units(step * 3)
+
+    def _on_tree_scroll(self, first, last):
+        """Tracks scrolling done by the tree itself (keyboard moves, see())."""
+        if self._rendering or not self._window:
+            return
+        if not self.tree.winfo_ismapped():
+            return
+        self.top = self.start + round(float(first) * len(self._window))
+        self._update_scrollbar()
+        stop = self.start + len(self._window)
+        near_top = self.top < self.start + 1 and self.start > 0
+        near_bottom = self.top + self.visible > stop - 1 and stop < len(self.rows)
+        if near_top or near_bottom:
+            self.tree.after_idle(self.refresh)
+
+    def _on_configure(self, event):
+        """Recomputes how many rows fit when the tree is resized."""
+        row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visible = max(1, (event.height - row_height) // row_height)
+        if visible != self.visible:
+            self.visible = visible
+            self.refresh()
+
+    def _on_select(self, event):
+        """Updates the remembered selection for the rows in the window."""
+        if self._rendering:
+            return
+        chosen = set(self.tree.selection())
+        for iid, record in self._window_records.items():
+            key = self.row_key(record)
+            if iid in chosen:
+                self.selected[key] = record
+            else:
+                self.selected.pop(key, None)
+
+    def _update_scrollbar(self):
+        """Sizes the scrollbar thumb to the window within the full list."""
+        count = len(self.rows)
+        if not count:
+            self.scrollbar.set(0.0, 1.0)
+            return
+        self.scrollbar.set(self.top / count, min(1.0, (self.top + self.visible) / count))